@@ -0,0 +1,271 @@
+"""Modo ASGI: endpoints públicos asíncronos junto a las vistas de Flask.
+
+    GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn asgi:aplicacion
+
+/salud, /api/productos y /api/pedidos/<id>/estado se atienden en el event
+loop con un motor SQLAlchemy asíncrono (aiosqlite o aiomysql): un cliente
+lento o que consulta el estado cada pocos segundos no ocupa un hilo. El
+resto de las rutas las atiende Flask en un pool de ASGI_HILOS_WSGI hilos
+(por defecto GUNICORN_THREADS), igual que en un worker gthread.
+
+Para desarrollo basta `uvicorn asgi:aplicacion`; con varios procesos conviene
+gunicorn, que activa TCP_NODELAY en el socket (`uvicorn --workers` no lo hace
+y cada respuesta espera el ACK retardado del cliente, unos 40 ms).
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+
+from flask_login import AnonymousUserMixin
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import (app, rastreo_cache, usuarios_cache, catalogo_cache, consulta_rastreo, armar_rastreo,
+                 datos_rastreo, consulta_catalogo, datos_catalogo)
+from config import uri_asincrona, opciones_motor_asincrono
+from models import UsuarioSesion
+
+app.config['ASGI_HILOS_WSGI'] = int(os.getenv('ASGI_HILOS_WSGI', os.getenv('GUNICORN_THREADS', '16')))
+
+# Cuerpos de petición más grandes que esto se pasan a Flask desde disco
+MAX_CUERPO_EN_MEMORIA = 1024 * 1024
+
+_FALTANTE = object()
+
+
+async def _responder(send, estado, datos=None, cabeceras=(), cuerpo=True):
+    contenido = b''
+    if datos is not None:
+        # Mismo formato que jsonify
+        contenido = (json.dumps(datos, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n').encode()
+    encabezados = [(b'content-type', b'application/json'), (b'content-length', str(len(contenido)).encode())]
+    encabezados += [(clave.encode('latin1'), valor.encode('latin1')) for clave, valor in cabeceras]
+    await send({'type': 'http.response.start', 'status': estado, 'headers': encabezados})
+    await send({'type': 'http.response.body', 'body': contenido if cuerpo else b''})
+
+
+def _cabecera(scope, nombre):
+    nombre = nombre.encode('latin1')
+    valores = [valor.decode('latin1') for clave, valor in scope['headers'] if clave.lower() == nombre]
+    return ', '.join(valores) if valores else None
+
+
+class PuenteWsgi:
+    """Atiende una aplicación WSGI desde ASGI en un pool de hilos propio.
+
+    asgiref.WsgiToAsgi ejecuta todas las peticiones en un único hilo; aquí
+    cada petición toma un hilo del pool, como en gunicorn con gthread, y el
+    cuerpo de la respuesta se envía por partes (sirve para el flujo SSE).
+    """
+
+    def __init__(self, aplicacion, hilos):
+        self.aplicacion = aplicacion
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        cuerpo = tempfile.SpooledTemporaryFile(max_size=MAX_CUERPO_EN_MEMORIA)
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'http.disconnect':
+                return
+            cuerpo.write(mensaje.get('body', b''))
+            if not mensaje.get('more_body'):
+                break
+        cuerpo.seek(0)
+        bucle = asyncio.get_running_loop()
+        desconectado = threading.Event()
+        vigilante = asyncio.create_task(self._vigilar(receive, desconectado))
+        try:
+            await bucle.run_in_executor(self.ejecutor, self._ejecutar, scope, cuerpo, send, bucle, desconectado)
+        finally:
+            vigilante.cancel()
+            cuerpo.close()
+
+    async def _vigilar(self, receive, desconectado):
+        # uvicorn descarta en silencio lo que se envía a un cliente que ya se
+        # fue: sin este aviso un flujo SSE retendría su hilo para siempre
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        desconectado.set()
+
+    def _entorno(self, scope, cuerpo):
+        servidor = scope.get('server') or ('localhost', 80)
+        entorno = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            'SERVER_NAME': servidor[0],
+            'SERVER_PORT': str(servidor[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': cuerpo,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            entorno['REMOTE_ADDR'] = scope['client'][0]
+        for clave, valor in scope['headers']:
+            nombre = clave.decode('latin1').upper().replace('-', '_')
+            if nombre not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                nombre = f'HTTP_{nombre}'
+            valor = valor.decode('latin1')
+            entorno[nombre] = f'{entorno[nombre]},{valor}' if nombre in entorno else valor
+        return entorno
+
+    def _ejecutar(self, scope, cuerpo, send, bucle, desconectado):
+        """Corre en un hilo del pool: llama a la app WSGI y reenvía la respuesta"""
+        def enviar(mensaje):
+            asyncio.run_coroutine_threadsafe(send(mensaje), bucle).result()
+
+        inicio = {}
+
+        def start_response(estado, cabeceras, exc_info=None):
+            inicio['status'] = int(estado.split(' ', 1)[0])
+            inicio['headers'] = [(clave.lower().encode('latin1'), valor.encode('latin1'))
+                                 for clave, valor in cabeceras]
+
+        resultado = self.aplicacion(self._entorno(scope, cuerpo), start_response)
+        try:
+            enviado = False
+            for parte in resultado:
+                if desconectado.is_set():
+                    # close() en el finally detiene el generador
+                    return
+                if not enviado:
+                    enviar({'type': 'http.response.start', **inicio})
+                    enviado = True
+                if parte:
+                    enviar({'type': 'http.response.body', 'body': parte, 'more_body': True})
+            if not enviado:
+                enviar({'type': 'http.response.start', **inicio})
+            enviar({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(resultado, 'close'):
+                resultado.close()
+
+
+class AplicacionAsgi:
+    """Enruta los endpoints asíncronos y delega el resto en Flask"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = PuenteWsgi(flask_app, flask_app.config['ASGI_HILOS_WSGI'])
+        self.motores = {}
+        self.rutas = [
+            (re.compile(r'/salud'), self.salud),
+            (re.compile(r'/api/productos'), self.productos),
+            (re.compile(r'/api/pedidos/(\d+)/estado'), self.estado_pedido),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] in ('GET', 'HEAD'):
+            for patron, manejador in self.rutas:
+                encontrado = patron.fullmatch(scope['path'])
+                if encontrado:
+                    return await manejador(scope, send, *encontrado.groups())
+        await self.wsgi(scope, receive, send)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                for motor in self.motores.values():
+                    await motor.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def motor(self):
+        """Motor asíncrono de la base primaria, creado al primer uso.
+
+        Los tres endpoints leen de la primaria: sus resultados se guardan en
+        las cachés del proceso y una réplica atrasada las volvería a llenar
+        con datos viejos tras una invalidación.
+        """
+        if 'primaria' not in self.motores:
+            uri = self.flask_app.config['SQLALCHEMY_DATABASE_URI']
+            self.motores['primaria'] = create_async_engine(uri_asincrona(uri), **opciones_motor_asincrono(uri))
+        return self.motores['primaria']
+
+    # ---- Endpoints ----
+
+    async def salud(self, scope, send):
+        try:
+            async with self.motor().connect() as conexion:
+                await conexion.execute(select(1))
+        except (SQLAlchemyError, OSError):
+            return await _responder(send, HTTPStatus.SERVICE_UNAVAILABLE, {'estado': 'error'},
+                                    cuerpo=scope['method'] == 'GET')
+        await _responder(send, HTTPStatus.OK, {'estado': 'ok'}, cuerpo=scope['method'] == 'GET')
+
+    async def productos(self, scope, send):
+        catalogo = catalogo_cache.get('catalogo')
+        if catalogo is None:
+            async with self.motor().connect() as conexion:
+                catalogo = datos_catalogo((await conexion.execute(consulta_catalogo())).all())
+            catalogo_cache.set('catalogo', catalogo)
+        await _responder(send, HTTPStatus.OK, catalogo, cuerpo=scope['method'] == 'GET')
+
+    async def estado_pedido(self, scope, send, id_pedido):
+        id_pedido = int(id_pedido)
+        # Misma caché que la vista de Flask del proceso: las escrituras de
+        # Flask la invalidan igual
+        rastreo = rastreo_cache.get(id_pedido, _FALTANTE)
+        if rastreo is _FALTANTE:
+            async with self.motor().connect() as conexion:
+                filas = (await conexion.execute(consulta_rastreo(id_pedido))).all()
+            rastreo = armar_rastreo(id_pedido, filas)
+            rastreo_cache.set(id_pedido, rastreo)
+        if rastreo is None:
+            return await _responder(send, HTTPStatus.NOT_FOUND, {'error': 'Pedido no encontrado'},
+                                    cuerpo=scope['method'] == 'GET')
+
+        datos, etag = datos_rastreo(rastreo, await self.usuario(scope))
+        cabeceras = [('etag', f'"{etag}"'), ('cache-control', 'private, no-cache'), ('vary', 'Cookie')]
+        coincidencias = _cabecera(scope, 'if-none-match') or ''
+        if f'"{etag}"' in [valor.strip() for valor in coincidencias.split(',')]:
+            return await _responder(send, HTTPStatus.NOT_MODIFIED, cabeceras=cabeceras, cuerpo=False)
+        await _responder(send, HTTPStatus.OK, datos, cabeceras, cuerpo=scope['method'] == 'GET')
+
+    async def usuario(self, scope):
+        """Usuario de la cookie de sesión de Flask, o anónimo"""
+        cookies = SimpleCookie(_cabecera(scope, 'cookie') or '')
+        nombre = self.flask_app.config['SESSION_COOKIE_NAME']
+        if nombre not in cookies:
+            return AnonymousUserMixin()
+        serializador = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        try:
+            sesion = serializador.loads(cookies[nombre].value,
+                                        max_age=int(self.flask_app.permanent_session_lifetime.total_seconds()))
+            id_usuario = int(sesion['_user_id'])
+        except (BadSignature, KeyError, TypeError, ValueError):
+            return AnonymousUserMixin()
+
+        usuario = usuarios_cache.get(id_usuario, _FALTANTE)
+        if usuario is _FALTANTE:
+            async with self.motor().connect() as conexion:
+                fila = (await conexion.execute(UsuarioSesion.consulta(id_usuario))).first()
+            usuario = UsuarioSesion(*fila) if fila else None
+            usuarios_cache.set(id_usuario, usuario)
+        return usuario or AnonymousUserMixin()
+
+
+aplicacion = AplicacionAsgi(app)
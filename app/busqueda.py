@@ -0,0 +1,237 @@
+import re
+
+from sqlalchemy import DDL, event, select, func, literal, literal_column, table, and_, or_, desc
+from sqlalchemy.dialects.mysql import match
+
+from models import db, Producto, Usuario, Cliente, Pedido, DetallePedido, SeguimientoPedido
+
+# El tokenizador trigram de FTS5 no encuentra términos de menos de 3 caracteres;
+# se usa el mismo mínimo en MySQL para que ambos motores respondan igual
+MIN_TERMINO = 3
+MAX_TERMINOS = 5
+
+# tabla -> (modelo, clave, columnas indexadas)
+INDICES = {
+    'productos': (Producto, 'id_producto', ('nombre', 'descripcion')),
+    'usuarios': (Usuario, 'id_usuario', ('nombre', 'correo')),
+    'clientes': (Cliente, 'id_cliente', ('telefono',)),
+    'seguimiento_pedido': (SeguimientoPedido, 'id_seguimiento', ('comentario',)),
+}
+
+
+def ddl_sqlite(tabla, clave, columnas):
+    """Tabla FTS5 de contenido externo y los triggers que la mantienen.
+
+    En MySQL el índice FULLTEXT (ngram) está declarado en el modelo; en
+    SQLite se usa FTS5 con tokenizador trigram, que también encuentra
+    subcadenas (parte de un correo o de un teléfono).
+    """
+    fts = f'{tabla}_fts'
+    lista = ', '.join(columnas)
+    nuevos = ', '.join(f'new.{columna}' for columna in columnas)
+    viejos = ', '.join(f'old.{columna}' for columna in columnas)
+    borrar = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.{clave}, {viejos});"
+    insertar = f'INSERT INTO {fts}(rowid, {lista}) VALUES (new.{clave}, {nuevos});'
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({lista}, content='{tabla}', "
+        f"content_rowid='{clave}', tokenize='trigram')",
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN {borrar} END',
+        # Solo las columnas indexadas: descontar stock no toca el índice
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabla} BEGIN {borrar} {insertar} END',
+    ]
+
+
+def _registrar_ddl_sqlite():
+    # create_all (init-db) crea las tablas FTS5 junto con cada tabla en SQLite
+    for tabla, (modelo, clave, columnas) in INDICES.items():
+        for sentencia in ddl_sqlite(tabla, clave, columnas):
+            event.listen(modelo.__table__, 'after_create', DDL(sentencia).execute_if(dialect='sqlite'))
+
+
+_registrar_ddl_sqlite()
+
+
+def terminos(texto):
+    return [termino for termino in (texto or '').split() if len(termino) >= MIN_TERMINO][:MAX_TERMINOS]
+
+
+def _coincidencias(tabla, lista, limite, recientes=False):
+    """[(id, puntaje)] de las filas de `tabla` que contienen todos los términos,
+    de mayor a menor puntaje. Los puntajes solo se comparan dentro de una tabla.
+
+    Con `recientes` se devuelven las de id más alto: un término frecuente no
+    obliga a puntuar y ordenar todas sus coincidencias.
+    """
+    modelo, clave, columnas = INDICES[tabla]
+    id_fila = getattr(modelo, clave)
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'mysql':
+        # Modo booleano: +"término" exige cada término (como frase de n-gramas)
+        expresion = ' '.join('+"{}"'.format(termino.replace('"', ' ')) for termino in lista)
+        puntaje = match(*(getattr(modelo, columna) for columna in columnas), against=expresion).in_boolean_mode()
+        stmt = select(id_fila.label('id'), puntaje.label('puntaje')).where(puntaje)
+    elif dialecto == 'sqlite':
+        fts = literal_column(f'{tabla}_fts')
+        expresion = ' '.join('"{}"'.format(termino.replace('"', '""')) for termino in lista)
+        # bm25 es menor cuanto más relevante: se invierte el signo
+        stmt = (
+            select(literal_column(f'{tabla}_fts.rowid').label('id'), (-func.bm25(fts)).label('puntaje'))
+            .select_from(table(f'{tabla}_fts'))
+            .where(fts.op('MATCH')(expresion))
+        )
+    else:
+        # Sin índice de texto: LIKE sobre cada columna (recorre la tabla)
+        stmt = select(id_fila.label('id'), literal(0).label('puntaje')).where(and_(*(
+            or_(*(getattr(modelo, columna).contains(termino, autoescape=True) for columna in columnas))
+            for termino in lista
+        )))
+    return db.session.execute(stmt.order_by(desc('id' if recientes else 'puntaje')).limit(limite)).all()
+
+
+def _id_pedido(texto):
+    encontrado = re.fullmatch(r'#?(\d{1,9})', (texto or '').strip())
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def _clientes(lista, limite):
+    """{id_cliente: puntaje} por nombre, correo o teléfono"""
+    puntajes = {}
+    por_usuario = dict(_coincidencias('usuarios', lista, limite * 2))
+    if por_usuario:
+        # Los usuarios incluyen empleados: solo cuentan los que son clientes
+        for id_cliente, id_usuario in db.session.execute(
+            select(Cliente.id_cliente, Cliente.id_usuario).where(Cliente.id_usuario.in_(por_usuario))
+        ):
+            puntajes[id_cliente] = por_usuario[id_usuario]
+    for id_cliente, puntaje in _coincidencias('clientes', lista, limite):
+        puntajes[id_cliente] = max(puntaje, puntajes.get(id_cliente, puntaje))
+    return dict(sorted(puntajes.items(), key=lambda par: par[1], reverse=True)[:limite])
+
+
+def _ordenar(puntajes):
+    return sorted(puntajes, key=lambda clave: puntajes[clave], reverse=True)
+
+
+def buscar(texto, limite=10):
+    """Pedidos, clientes y productos que coinciden con `texto`, mejores primero.
+
+    Un pedido coincide por su número, por los comentarios de su seguimiento,
+    por su cliente o por sus productos; se ordena por cuántas de esas vías
+    coinciden, luego por puntaje y luego por recencia. Cada vía es una
+    consulta acotada por índice, así el costo no depende del tamaño de las
+    tablas.
+    """
+    lista = terminos(texto)
+    id_exacto = _id_pedido(texto)
+    productos = dict(_coincidencias('productos', lista, limite)) if lista else {}
+    clientes = _clientes(lista, limite) if lista else {}
+
+    # id_pedido -> [vías que coinciden, mejor puntaje]
+    pedidos = {}
+
+    def sumar(id_pedido, puntaje):
+        actual = pedidos.setdefault(id_pedido, [0, puntaje])
+        actual[0] += 1
+        actual[1] = max(actual[1], puntaje)
+
+    if lista:
+        # Comentarios: los más recientes, como en los listados de pedidos
+        comentarios = dict(_coincidencias('seguimiento_pedido', lista, limite, recientes=True))
+        if comentarios:
+            for id_seguimiento, id_pedido in db.session.execute(
+                select(SeguimientoPedido.id_seguimiento, SeguimientoPedido.id_pedido)
+                .where(SeguimientoPedido.id_seguimiento.in_(comentarios))
+            ):
+                sumar(id_pedido, comentarios[id_seguimiento])
+    if clientes:
+        for id_pedido, id_cliente in db.session.execute(
+            select(Pedido.id_pedido, Pedido.id_cliente)
+            .where(Pedido.id_cliente.in_(clientes))
+            .order_by(Pedido.fecha.desc())
+            .limit(limite)
+        ):
+            sumar(id_pedido, clientes[id_cliente])
+    if productos:
+        for id_pedido, id_producto in db.session.execute(
+            select(DetallePedido.id_pedido, DetallePedido.id_producto)
+            .where(DetallePedido.id_producto.in_(productos))
+            .order_by(DetallePedido.id_pedido.desc())
+            .limit(limite)
+        ):
+            sumar(id_pedido, productos[id_producto])
+
+    rango = {id_pedido: (id_pedido == id_exacto, vias, puntaje, id_pedido)
+             for id_pedido, (vias, puntaje) in pedidos.items()}
+    if id_exacto is not None and id_exacto not in rango:
+        rango[id_exacto] = (True, 0, 0, id_exacto)
+    ids_pedidos = _ordenar(rango)[:limite]
+
+    return {
+        'pedidos': _cargar_pedidos(ids_pedidos),
+        'clientes': _cargar_clientes(list(clientes)),
+        'productos': _cargar_productos(_ordenar(productos)),
+    }
+
+
+def id_cliente_buscado(texto):
+    """Id de una búsqueda "cliente:<id>" (pedidos de un cliente), o None"""
+    encontrado = re.fullmatch(r'cliente:(\d{1,9})', (texto or '').strip())
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def pedidos_de_cliente(id_cliente, limite=20):
+    ids = db.session.scalars(
+        select(Pedido.id_pedido)
+        .where(Pedido.id_cliente == id_cliente)
+        .order_by(Pedido.fecha.desc())
+        .limit(limite)
+    ).all()
+    return {'pedidos': _cargar_pedidos(ids), 'clientes': _cargar_clientes([id_cliente]), 'productos': []}
+
+
+def _en_orden(filas, ids):
+    por_id = {fila['id']: fila for fila in filas}
+    return [por_id[id_] for id_ in ids if id_ in por_id]
+
+
+def _cargar_pedidos(ids):
+    if not ids:
+        return []
+    filas = db.session.execute(
+        select(Pedido.id_pedido, Pedido.fecha, Pedido.estado, Pedido.total, Usuario.nombre)
+        .outerjoin(Cliente, Cliente.id_cliente == Pedido.id_cliente)
+        .outerjoin(Usuario, Usuario.id_usuario == Cliente.id_usuario)
+        .where(Pedido.id_pedido.in_(ids))
+    ).all()
+    return _en_orden([
+        {'id': id_pedido, 'fecha': fecha, 'estado': estado, 'total': total, 'cliente': cliente}
+        for id_pedido, fecha, estado, total, cliente in filas
+    ], ids)
+
+
+def _cargar_clientes(ids):
+    if not ids:
+        return []
+    filas = db.session.execute(
+        select(Cliente.id_cliente, Usuario.nombre, Usuario.correo, Cliente.telefono)
+        .join(Usuario, Usuario.id_usuario == Cliente.id_usuario)
+        .where(Cliente.id_cliente.in_(ids))
+    ).all()
+    return _en_orden([
+        {'id': id_cliente, 'nombre': nombre, 'correo': correo, 'telefono': telefono}
+        for id_cliente, nombre, correo, telefono in filas
+    ], ids)
+
+
+def _cargar_productos(ids):
+    if not ids:
+        return []
+    filas = db.session.execute(
+        select(Producto.id_producto, Producto.nombre, Producto.precio, Producto.stock)
+        .where(Producto.id_producto.in_(ids))
+    ).all()
+    return _en_orden([
+        {'id': id_producto, 'nombre': nombre, 'precio': precio, 'stock': stock}
+        for id_producto, nombre, precio, stock in filas
+    ], ids)
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class CacheTTL:
+    """Caché en memoria del proceso con expiración por tiempo y tamaño acotado (LRU)"""
+
+    def __init__(self, ttl=30, max_entradas=1024):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return defecto
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return defecto
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def get_or_set(self, clave, funcion, ttl=None):
+        """Devuelve el valor en caché o lo calcula con `funcion()` y lo guarda"""
+        valor = self.get(clave, _FALTANTE)
+        if valor is _FALTANTE:
+            valor = funcion()
+            self.set(clave, valor, ttl)
+        return valor
+
+    def invalidar(self, clave=None):
+        """Elimina una clave, o toda la caché si no se indica ninguna"""
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+_FALTANTE = object()
+
+# (cache, modelos, funcion que obtiene la clave a partir del objeto modificado)
+_suscripciones = []
+
+
+def invalidar_al_escribir(cache, *modelos, clave=None):
+    """Invalida la caché cuando se confirma una escritura sobre alguno de los modelos.
+
+    Si se pasa `clave`, solo se elimina la entrada `clave(objeto)` del objeto
+    modificado; las escrituras masivas (insert/update/delete ejecutados con
+    session.execute, como las de importacion.py) siempre vacían la caché
+    completa.
+    """
+    _suscripciones.append((cache, modelos, clave))
+
+
+def _pendientes(session):
+    return session.info.setdefault('cache_pendientes', [])
+
+
+def _registrar(session, clase, obj=None):
+    # Las claves se calculan durante el flush: tras el commit los objetos
+    # quedan expirados y no se pueden leer sin volver a consultar
+    for cache, modelos, clave in _suscripciones:
+        if issubclass(clase, modelos):
+            _pendientes(session).append(
+                (cache, clave(obj) if clave is not None and obj is not None else None)
+            )
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        _registrar(session, type(obj), obj)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registrar_cambios_masivos(orm_execute_state):
+    if ((orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)
+            and orm_execute_state.bind_mapper):
+        _registrar(orm_execute_state.session, orm_execute_state.bind_mapper.class_)
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_invalidaciones(session):
+    for cache, clave in session.info.pop('cache_pendientes', []):
+        cache.invalidar(clave)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_invalidaciones(session):
+    session.info.pop('cache_pendientes', None)
@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from flask import request, session, make_response
+from flask_login import current_user
+
+from cache import CacheTTL
+
+
+class CachePaginas:
+    """Caché de HTML renderizado para páginas que no cambian entre despliegues.
+
+    Solo se sirve desde caché a visitantes anónimos sin mensajes flash
+    pendientes: el encabezado cambia según el usuario. El backend es
+    cualquier objeto con get(clave) y set(clave, valor); por defecto una
+    CacheTTL (LRU acotada) en memoria del proceso.
+    """
+
+    def __init__(self, backend=None, max_age=300):
+        self.backend = backend if backend is not None else CacheTTL(ttl=24 * 3600, max_entradas=256)
+        self.max_age = max_age
+
+    def init_app(self, app):
+        self.max_age = int(app.config.get('PAGE_CACHE_MAX_AGE', self.max_age))
+        if not app.config.get('PAGE_CACHE', True):
+            self.backend = None
+        app.extensions['cache_paginas'] = self
+
+    def _cacheable(self):
+        return (
+            self.backend is not None
+            and request.method in ('GET', 'HEAD')
+            and not current_user.is_authenticated
+            and not session.get('_flashes')
+        )
+
+    def __call__(self, vista):
+        @wraps(vista)
+        def vista_cacheada(*args, **kwargs):
+            if not self._cacheable():
+                return vista(*args, **kwargs)
+
+            # La ruta (sin query string) es la clave: los parámetros no cambian
+            # el contenido y así no se puede inflar la caché con ?x=1, ?x=2...
+            clave = ('pagina', request.path)
+            entrada = self.backend.get(clave)
+            if entrada is None:
+                original = make_response(vista(*args, **kwargs))
+                if original.status_code != 200:
+                    return original
+                cuerpo = original.get_data()
+                entrada = (cuerpo, hashlib.sha256(cuerpo).hexdigest()[:32])
+                self.backend.set(clave, entrada)
+
+            cuerpo, etag = entrada
+            respuesta = make_response(cuerpo)
+            respuesta.set_etag(etag)
+            respuesta.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+            respuesta.vary.add('Cookie')
+            return respuesta.make_conditional(request)
+        return vista_cacheada
+
+    def invalidar(self):
+        if self.backend is not None and hasattr(self.backend, 'invalidar'):
+            self.backend.invalidar()
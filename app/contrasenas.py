@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Parámetros que werkzeug usa cuando el método no los indica
+_PARAMETROS_POR_DEFECTO = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}',
+    'pbkdf2:sha256': f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}',
+    'pbkdf2:sha512': f'pbkdf2:sha512:{DEFAULT_PBKDF2_ITERATIONS}',
+}
+
+
+class ServicioSaturado(Exception):
+    """Hay demasiados cálculos de hash en espera"""
+
+
+def metodo_completo(metodo):
+    """Método de werkzeug con todos sus parámetros explícitos"""
+    return _PARAMETROS_POR_DEFECTO.get(metodo, metodo)
+
+
+class ServicioContrasenas:
+    """Calcula y verifica hashes de contraseñas fuera del hilo de la petición.
+
+    Los hashes (scrypt/pbkdf2) consumen 50-300 ms de CPU; se calculan en un
+    pool de procesos acotado para no bloquear al worker. Con
+    PASSWORD_HASH_WORKERS=0 se calculan en el mismo proceso.
+    """
+
+    def __init__(self, app=None):
+        self.metodo = metodo_completo('scrypt')
+        self.procesos = 0
+        self.max_pendientes = 0
+        self.espera = 5.0
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._cupos = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.metodo = metodo_completo(app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
+        self.procesos = int(app.config.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+        self.max_pendientes = int(app.config.get('PASSWORD_HASH_MAX_PENDIENTES', self.procesos * 8))
+        self.espera = float(app.config.get('PASSWORD_HASH_TIMEOUT', self.espera))
+        self._cupos = threading.BoundedSemaphore(self.max_pendientes) if self.procesos else None
+        app.extensions['contrasenas'] = self
+
+    def _ejecutor(self):
+        with self._lock:
+            # Un pool por proceso: tras el fork de gunicorn el del padre no sirve
+            if self._pool is None or self._pid != os.getpid():
+                # spawn: los procesos hijos no heredan hilos ni conexiones
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def _ejecutar(self, funcion, *args):
+        if not self.procesos:
+            return funcion(*args)
+        if not self._cupos.acquire(timeout=self.espera):
+            raise ServicioSaturado()
+        try:
+            futuro = self._ejecutor().submit(funcion, *args)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return futuro.result()
+
+    def generar(self, password):
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def verificar(self, hash_guardado, password):
+        return self._ejecutar(check_password_hash, hash_guardado, password)
+
+    def necesita_rehash(self, hash_guardado):
+        """True si el hash se calculó con parámetros distintos a los actuales"""
+        metodo = hash_guardado.split('$', 1)[0]
+        return metodo_completo(metodo) != self.metodo
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+contrasenas = ServicioContrasenas()
+
+
+# Claves distintas (cuentas + IPs) antes de purgar las que ya expiraron
+MAX_CLAVES_LIMITADOR = 100000
+
+
+class LimitadorIntentos:
+    """Cuenta inicios de sesión fallidos por cuenta y por IP en una ventana.
+
+    Se consulta antes de calcular el hash, así los ataques de fuerza bruta
+    se rechazan sin costo de CPU. Los contadores viven en memoria del
+    proceso (cada worker lleva los suyos).
+    """
+
+    def __init__(self, max_por_cuenta=5, max_por_ip=20, ventana=900):
+        self.max_por_cuenta = max_por_cuenta
+        self.max_por_ip = max_por_ip
+        self.ventana = ventana
+        self._fallos = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_por_cuenta = int(app.config.get('LOGIN_MAX_FALLOS_CUENTA', self.max_por_cuenta))
+        self.max_por_ip = int(app.config.get('LOGIN_MAX_FALLOS_IP', self.max_por_ip))
+        self.ventana = int(app.config.get('LOGIN_VENTANA_SEGUNDOS', self.ventana))
+        app.extensions['limitador_login'] = self
+
+    def _recientes(self, clave, ahora):
+        fallos = self._fallos.get(clave)
+        if fallos is None:
+            return 0
+        while fallos and fallos[0] <= ahora - self.ventana:
+            fallos.popleft()
+        if not fallos:
+            del self._fallos[clave]
+            return 0
+        return len(fallos)
+
+    def bloqueado(self, correo, ip):
+        """Segundos que faltan para poder reintentar, o 0 si no está bloqueado"""
+        ahora = time.monotonic()
+        espera = 0
+        with self._lock:
+            for clave, maximo in ((('cuenta', correo), self.max_por_cuenta), (('ip', ip), self.max_por_ip)):
+                if self._recientes(clave, ahora) >= maximo:
+                    espera = max(espera, self._fallos[clave][0] + self.ventana - ahora)
+        return int(espera) + 1 if espera else 0
+
+    def registrar_fallo(self, correo, ip):
+        ahora = time.monotonic()
+        with self._lock:
+            if len(self._fallos) > MAX_CLAVES_LIMITADOR:
+                for clave in list(self._fallos):
+                    self._recientes(clave, ahora)
+            self._fallos[('cuenta', correo)].append(ahora)
+            self._fallos[('ip', ip)].append(ahora)
+
+    def registrar_exito(self, correo):
+        with self._lock:
+            self._fallos.pop(('cuenta', correo), None)
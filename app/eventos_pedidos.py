@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import aliased
+
+from cache import invalidar_al_escribir
+from models import db, Pedido, Cliente, Usuario, SeguimientoPedido
+
+logger = logging.getLogger('luma.eventos')
+
+# Eventos recientes en memoria para que los oyentes se reanuden sin consultar
+HISTORIAL = 1000
+# Máximo de eventos que se recuperan de la base al reanudar una conexión
+MAX_REANUDACION = 500
+# Segundos entre comentarios de keep-alive
+LATIDO = 15
+# Las conexiones se cierran tras este tiempo; EventSource se reconecta solo
+# enviando Last-Event-ID, así ningún hilo queda tomado indefinidamente
+DURACION_MAXIMA = 300
+# Segundos que espera un tablero rechazado por límite de oyentes antes de reintentar
+ESPERA_SATURADO = 30
+
+
+def ultimo_evento():
+    """Id del último seguimiento registrado (posición inicial del tablero)"""
+    return db.session.scalar(select(func.max(SeguimientoPedido.id_seguimiento))) or 0
+
+
+def consultar_eventos(desde, limite=MAX_REANUDACION):
+    """Eventos con id de seguimiento mayor que `desde`, en orden"""
+    anterior = aliased(SeguimientoPedido)
+    es_primero = ~exists().where(
+        anterior.id_pedido == SeguimientoPedido.id_pedido,
+        anterior.id_seguimiento < SeguimientoPedido.id_seguimiento,
+    )
+    filas = db.session.execute(
+        select(SeguimientoPedido.id_seguimiento, SeguimientoPedido.id_pedido,
+               SeguimientoPedido.estado, SeguimientoPedido.fecha, SeguimientoPedido.comentario,
+               Pedido.fecha, Usuario.nombre, Pedido.num_items, Pedido.total, es_primero)
+        .join(Pedido, Pedido.id_pedido == SeguimientoPedido.id_pedido)
+        .outerjoin(Cliente, Cliente.id_cliente == Pedido.id_cliente)
+        .outerjoin(Usuario, Usuario.id_usuario == Cliente.id_usuario)
+        .where(SeguimientoPedido.id_seguimiento > desde)
+        .order_by(SeguimientoPedido.id_seguimiento)
+        .limit(limite)
+    ).all()
+    return [
+        {
+            'id': id_seguimiento,
+            'tipo': 'pedido_creado' if primero else 'estado_cambiado',
+            'id_pedido': id_pedido,
+            'estado': estado,
+            'fecha': fecha.isoformat(),
+            'comentario': comentario,
+            'fecha_pedido': fecha_pedido.isoformat(),
+            'cliente': cliente,
+            'items': cantidad,
+            'total': str(total),
+        }
+        for (id_seguimiento, id_pedido, estado, fecha, comentario,
+             fecha_pedido, cliente, cantidad, total, primero) in filas
+    ]
+
+
+def formatear(evento):
+    datos = json.dumps(evento, ensure_ascii=False)
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+class CentralEventos:
+    """Difusión de eventos de pedidos (Server-Sent Events) dentro de un proceso.
+
+    Un único hilo por proceso consulta los seguimientos nuevos y despierta a
+    todos los oyentes, en lugar de una consulta por empleado conectado. El
+    id del seguimiento es el id del evento, así que un cliente se reanuda
+    con Last-Event-ID aunque se conecte a otro worker.
+
+    Cada conexión abierta ocupa un hilo del worker mientras dura, así que
+    se admiten a lo sumo `max_oyentes` por proceso (EVENTOS_MAX_OYENTES):
+    los hilos restantes quedan para las demás peticiones.
+    """
+
+    def __init__(self, app=None):
+        self._condicion = threading.Condition()
+        self._eventos = deque(maxlen=HISTORIAL)
+        self._despertador = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._oyentes = 0
+        self._conexiones = 0
+        self.max_oyentes = 8
+        # El historial en memoria está completo para ids mayores que _base_id
+        self._base_id = None
+        self._ultimo_id = None
+        self.intervalo = 2.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.intervalo = float(app.config.get('EVENTOS_INTERVALO', self.intervalo))
+        self.max_oyentes = int(app.config.get('EVENTOS_MAX_OYENTES', self.max_oyentes))
+        app.extensions['eventos_pedidos'] = self
+        # Los seguimientos confirmados en este proceso se publican sin esperar
+        # al siguiente sondeo; los de otros procesos llegan por el sondeo
+        invalidar_al_escribir(self, SeguimientoPedido)
+
+    def invalidar(self, clave=None):
+        """Interfaz de invalidar_al_escribir: hay seguimientos nuevos"""
+        self._despertador.set()
+
+    def oyentes(self):
+        return self._oyentes
+
+    def reservar(self):
+        """Toma un lugar para una conexión; False si ya hay max_oyentes abiertas"""
+        with self._condicion:
+            if self._conexiones >= self.max_oyentes:
+                return False
+            self._conexiones += 1
+            return True
+
+    def liberar(self):
+        """Devuelve el lugar tomado con reservar() al cerrarse la conexión"""
+        with self._condicion:
+            self._conexiones -= 1
+
+    def reanudar(self, ultimo_id):
+        """Eventos posteriores a `ultimo_id` que no están en memoria.
+
+        Devuelve (eventos, completo); completo es False si faltan más de
+        MAX_REANUDACION y el cliente debe recargar la página.
+        """
+        with self._condicion:
+            if self._activo() and ultimo_id >= self._base_id:
+                return [], True
+        eventos = consultar_eventos(ultimo_id)
+        return eventos, len(eventos) < MAX_REANUDACION
+
+    def escuchar(self, ultimo_id, recuperados=(), completo=True):
+        """Generador del flujo text/event-stream para un oyente"""
+        yield f'retry: {int(self.intervalo * 1000)}\n\n'
+        if not completo:
+            yield 'event: recargar\ndata: {}\n\n'
+            return
+        for evento in recuperados:
+            yield formatear(evento)
+            ultimo_id = evento['id']
+
+        if not self._suscribir(ultimo_id):
+            yield 'event: recargar\ndata: {}\n\n'
+            return
+        try:
+            limite = time.monotonic() + DURACION_MAXIMA
+            while time.monotonic() < limite:
+                with self._condicion:
+                    nuevos = self._posteriores(ultimo_id)
+                    if not nuevos:
+                        self._condicion.wait(LATIDO)
+                        nuevos = self._posteriores(ultimo_id)
+                if not nuevos:
+                    yield ': latido\n\n'
+                    continue
+                for evento in nuevos:
+                    yield formatear(evento)
+                    ultimo_id = evento['id']
+        finally:
+            self._desuscribir()
+
+    def _activo(self):
+        return self._hilo is not None and self._pid == os.getpid()
+
+    def _posteriores(self, ultimo_id):
+        return [evento for evento in self._eventos if evento['id'] > ultimo_id]
+
+    def _suscribir(self, ultimo_id):
+        with self._condicion:
+            if not self._activo():
+                # Tras un fork el hilo del padre no existe en el hijo
+                self._eventos.clear()
+                self._base_id = self._ultimo_id = ultimo_id
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._sondear, name='eventos-pedidos', daemon=True)
+                self._hilo.start()
+            elif ultimo_id < self._base_id:
+                # Otro oyente arrancó el sondeo más adelante: hay un hueco
+                return False
+            self._oyentes += 1
+            return True
+
+    def _desuscribir(self):
+        with self._condicion:
+            self._oyentes -= 1
+
+    def _sondear(self):
+        while True:
+            with self._condicion:
+                # Sin oyentes no se consulta; el próximo oyente lo vuelve a iniciar
+                if self._oyentes == 0:
+                    self._hilo = None
+                    return
+                desde = self._ultimo_id
+            try:
+                with self.app.app_context():
+                    nuevos = consultar_eventos(desde)
+            except Exception:
+                logger.exception('Error al consultar eventos de pedidos')
+                nuevos = []
+
+            if nuevos:
+                with self._condicion:
+                    for evento in nuevos:
+                        if len(self._eventos) == self._eventos.maxlen:
+                            self._base_id = self._eventos[0]['id']
+                        self._eventos.append(evento)
+                    self._ultimo_id = nuevos[-1]['id']
+                    self._condicion.notify_all()
+                if len(nuevos) == MAX_REANUDACION:
+                    continue
+
+            self._despertador.wait(self.intervalo)
+            self._despertador.clear()
@@ -0,0 +1,168 @@
+import csv
+import importlib.util
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from models import db, Pedido, DetallePedido, Producto, Cliente, Usuario
+
+# Filas que se traen del cursor del servidor por vez (y filas por row group)
+LOTE_POR_DEFECTO = 5000
+
+COLUMNAS = [
+    'id_pedido', 'fecha', 'estado', 'id_cliente', 'cliente', 'correo', 'telefono',
+    'id_detalle', 'id_producto', 'producto', 'cantidad', 'precio', 'subtotal',
+]
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+def pyarrow_disponible():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def rango_fechas(desde, hasta):
+    """Convierte fechas AAAA-MM-DD en un rango [desde, hasta + 1 día)"""
+    inicio = datetime.strptime(desde, '%Y-%m-%d') if desde else None
+    fin = datetime.strptime(hasta, '%Y-%m-%d') + timedelta(days=1) if hasta else None
+    return inicio, fin
+
+
+def consulta(desde=None, hasta=None, estados=None):
+    """Pedidos con sus líneas, producto y cliente; una fila por línea de detalle"""
+    stmt = (
+        select(Pedido.id_pedido, Pedido.fecha, Pedido.estado, Cliente.id_cliente,
+               Usuario.nombre, Usuario.correo, Cliente.telefono,
+               DetallePedido.id_detalle, Producto.id_producto, Producto.nombre,
+               DetallePedido.cantidad,
+               # Precio al momento del pedido; las líneas anteriores a la columna usan el actual
+               func.coalesce(DetallePedido.precio_unitario, Producto.precio))
+        .outerjoin(Cliente, Cliente.id_cliente == Pedido.id_cliente)
+        .outerjoin(Usuario, Usuario.id_usuario == Cliente.id_usuario)
+        .outerjoin(DetallePedido, DetallePedido.id_pedido == Pedido.id_pedido)
+        .outerjoin(Producto, Producto.id_producto == DetallePedido.id_producto)
+        .order_by(Pedido.fecha, Pedido.id_pedido, DetallePedido.id_detalle)
+    )
+    if desde is not None:
+        stmt = stmt.where(Pedido.fecha >= desde)
+    if hasta is not None:
+        stmt = stmt.where(Pedido.fecha < hasta)
+    if estados:
+        stmt = stmt.where(Pedido.estado.in_(estados))
+    return stmt
+
+
+def lotes(stmt, lote=LOTE_POR_DEFECTO):
+    """Itera listas de filas usando un cursor del lado del servidor.
+
+    yield_per activa stream_results: el driver no descarga todo el
+    resultado en memoria (SSCursor en MySQL).
+    """
+    resultado = db.session.execute(stmt.execution_options(yield_per=lote))
+    for particion in resultado.partitions():
+        yield [_con_subtotal(fila) for fila in particion]
+
+
+def _con_subtotal(fila):
+    fila = tuple(fila)
+    cantidad, precio = fila[-2], fila[-1]
+    subtotal = cantidad * precio if cantidad is not None and precio is not None else None
+    return fila + (subtotal,)
+
+
+def exportar_csv(stmt, lote=LOTE_POR_DEFECTO):
+    """Genera el CSV en bloques de texto, uno por lote de filas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for filas in lotes(stmt, lote):
+        escritor.writerows(filas)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _esquema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id_pedido', pa.int64()),
+        ('fecha', pa.timestamp('us')),
+        ('estado', pa.string()),
+        ('id_cliente', pa.int64()),
+        ('cliente', pa.string()),
+        ('correo', pa.string()),
+        ('telefono', pa.string()),
+        ('id_detalle', pa.int64()),
+        ('id_producto', pa.int64()),
+        ('producto', pa.string()),
+        ('cantidad', pa.int64()),
+        ('precio', pa.decimal128(10, 2)),
+        ('subtotal', pa.decimal128(18, 2)),
+    ])
+
+
+class _Salida:
+    """Archivo de solo escritura que acumula bytes hasta que se vacían"""
+
+    def __init__(self):
+        self._partes = []
+        self.closed = False
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def exportar_columnar(stmt, formato, lote=LOTE_POR_DEFECTO):
+    """Genera Parquet (un row group por lote) o Arrow IPC en bloques de bytes.
+
+    Requiere pyarrow, que es opcional: se importa solo al usarlo.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('La exportación a Parquet/Arrow requiere pyarrow (pip install pyarrow).')
+
+    esquema = _esquema()
+    salida = _Salida()
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(salida, esquema, compression='zstd')
+    else:
+        escritor = pa.ipc.new_stream(salida, esquema)
+    for filas in lotes(stmt, lote):
+        columnas = list(zip(*filas))
+        escritor.write_batch(pa.record_batch(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema
+        ))
+        yield salida.vaciar()
+    escritor.close()
+    yield salida.vaciar()
+
+
+def exportar(stmt, formato, lote=LOTE_POR_DEFECTO):
+    if formato == 'csv':
+        return exportar_csv(stmt, lote)
+    if formato in ('parquet', 'arrow'):
+        return exportar_columnar(stmt, formato, lote)
+    raise ValueError(f'Formato desconocido: {formato}')
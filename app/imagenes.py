@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+
+from flask import request, url_for
+from markupsafe import Markup, escape
+
+# Anchos generados para cada imagen (nunca mayores que el original)
+ANCHOS = (480, 960, 1600)
+EXTENSIONES = ('.jpg', '.jpeg', '.png')
+SUBDIRECTORIO = 'generadas'
+MANIFIESTO = 'manifest.json'
+
+# Formato -> (formato de Pillow, opciones de guardado, tipo MIME)
+FORMATOS = {
+    'avif': ('AVIF', {'quality': 50}, 'image/avif'),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}, 'image/webp'),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}, 'image/jpeg'),
+    'png': ('PNG', {'optimize': True}, 'image/png'),
+}
+
+
+def _hash_archivo(ruta):
+    with open(ruta, 'rb') as archivo:
+        return hashlib.sha256(archivo.read()).hexdigest()
+
+
+def _formatos_disponibles(con_transparencia):
+    from PIL import features
+
+    formatos = []
+    if features.check('avif'):
+        formatos.append('avif')
+    if features.check('webp'):
+        formatos.append('webp')
+    # Respaldo para navegadores sin formatos modernos
+    formatos.append('png' if con_transparencia else 'jpg')
+    return formatos
+
+
+def _generar_imagen(ruta_origen, directorio_salida, nombre):
+    from PIL import Image, ImageOps
+
+    base = os.path.splitext(nombre)[0]
+    variantes = {}
+    with Image.open(ruta_origen) as original:
+        original = ImageOps.exif_transpose(original)
+        con_transparencia = original.mode in ('RGBA', 'LA') or (
+            original.mode == 'P' and 'transparency' in original.info)
+        ancho_original, alto_original = original.size
+        anchos = sorted({a for a in ANCHOS if a < ancho_original} | {ancho_original})
+
+        for formato in _formatos_disponibles(con_transparencia):
+            formato_pil, opciones, _ = FORMATOS[formato]
+            variantes[formato] = {}
+            for ancho in anchos:
+                alto = round(alto_original * ancho / ancho_original)
+                imagen = original.resize((ancho, alto), Image.LANCZOS) if ancho != ancho_original else original.copy()
+                if formato == 'jpg':
+                    imagen = imagen.convert('RGB')
+                temporal = os.path.join(directorio_salida, f'.{base}-{ancho}.{formato}.tmp')
+                imagen.save(temporal, formato_pil, **opciones)
+                huella = _hash_archivo(temporal)[:10]
+                destino = f'{base}-{ancho}.{huella}.{formato}'
+                os.replace(temporal, os.path.join(directorio_salida, destino))
+                variantes[formato][ancho] = destino
+
+    return {
+        'ancho': ancho_original,
+        'alto': alto_original,
+        'variantes': variantes,
+    }
+
+
+def generar_variantes(directorio_imagenes, forzar=False):
+    """Genera variantes AVIF/WebP/JPEG en varios anchos con nombre con huella.
+
+    Solo reprocesa las imágenes cuyo contenido cambió desde la última vez
+    (según el hash guardado en el manifiesto). Devuelve (generadas, omitidas).
+    """
+    directorio_salida = os.path.join(directorio_imagenes, SUBDIRECTORIO)
+    os.makedirs(directorio_salida, exist_ok=True)
+    ruta_manifiesto = os.path.join(directorio_salida, MANIFIESTO)
+    manifiesto = _leer_manifiesto(ruta_manifiesto)
+
+    generadas = omitidas = 0
+    nombres = sorted(
+        nombre for nombre in os.listdir(directorio_imagenes)
+        if nombre.lower().endswith(EXTENSIONES) and not nombre.startswith('favicon')
+    )
+    for nombre in nombres:
+        ruta = os.path.join(directorio_imagenes, nombre)
+        huella = _hash_archivo(ruta)
+        anterior = manifiesto.get(nombre)
+        if (not forzar and anterior and anterior['hash'] == huella
+                and all(os.path.exists(os.path.join(directorio_salida, archivo))
+                        for anchos in anterior['variantes'].values() for archivo in anchos.values())):
+            omitidas += 1
+            continue
+
+        entrada = _generar_imagen(ruta, directorio_salida, nombre)
+        entrada['hash'] = huella
+        if anterior:
+            _eliminar_obsoletos(directorio_salida, anterior, entrada)
+        manifiesto[nombre] = entrada
+        generadas += 1
+
+    # Quitar del manifiesto las imágenes que ya no existen
+    for nombre in set(manifiesto) - set(nombres):
+        _eliminar_obsoletos(directorio_salida, manifiesto.pop(nombre), {'variantes': {}})
+
+    temporal = ruta_manifiesto + '.tmp'
+    with open(temporal, 'w') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+    os.replace(temporal, ruta_manifiesto)
+    return generadas, omitidas
+
+
+def _eliminar_obsoletos(directorio_salida, anterior, nueva):
+    vigentes = {archivo for anchos in nueva['variantes'].values() for archivo in anchos.values()}
+    for anchos in anterior['variantes'].values():
+        for archivo in anchos.values():
+            if archivo not in vigentes:
+                try:
+                    os.remove(os.path.join(directorio_salida, archivo))
+                except FileNotFoundError:
+                    pass
+
+
+def _leer_manifiesto(ruta):
+    try:
+        with open(ruta) as archivo:
+            datos = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+    # JSON guarda las claves de ancho como texto
+    for entrada in datos.values():
+        entrada['variantes'] = {
+            formato: {int(ancho): archivo for ancho, archivo in anchos.items()}
+            for formato, anchos in entrada['variantes'].items()
+        }
+    return datos
+
+
+class ImagenesResponsivas:
+    """Helpers de Jinja para servir las variantes generadas por `flask luma imagenes`.
+
+    Si una imagen no tiene variantes (no se ejecutó el comando) se usa el
+    archivo original, así las plantillas funcionan igual en desarrollo.
+    """
+
+    def __init__(self, app=None):
+        self._manifiesto = {}
+        self._mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directorio = os.path.join(app.static_folder, 'images')
+        self.ruta_manifiesto = os.path.join(self.directorio, SUBDIRECTORIO, MANIFIESTO)
+        self.prefijo_inmutable = f'{app.static_url_path}/images/{SUBDIRECTORIO}/'
+        app.jinja_env.globals['imagen_responsiva'] = self.imagen_responsiva
+        app.jinja_env.globals['imagen_fondo'] = self.imagen_fondo
+        app.after_request(self._cabeceras_cache)
+        app.extensions['imagenes'] = self
+
+    def manifiesto(self):
+        try:
+            mtime = os.path.getmtime(self.ruta_manifiesto)
+        except OSError:
+            return {}
+        if mtime != self._mtime:
+            self._manifiesto = _leer_manifiesto(self.ruta_manifiesto)
+            self._mtime = mtime
+        return self._manifiesto
+
+    @staticmethod
+    def _por_preferencia(variantes):
+        # El navegador usa el primer formato que soporta: de más a menos eficiente
+        return [(formato, variantes[formato]) for formato in FORMATOS if formato in variantes]
+
+    def _url(self, archivo):
+        return url_for('static', filename=f'images/{SUBDIRECTORIO}/{archivo}')
+
+    def _srcset(self, anchos):
+        return ', '.join(f'{self._url(archivo)} {ancho}w' for ancho, archivo in sorted(anchos.items()))
+
+    def imagen_responsiva(self, nombre, alt='', sizes='100vw', clase='', lazy=True):
+        """<picture> con AVIF/WebP y srcset por ancho; carga diferida por defecto"""
+        carga = 'lazy' if lazy else 'eager'
+        entrada = self.manifiesto().get(nombre)
+        atributos_clase = f' class="{escape(clase)}"' if clase else ''
+        if not entrada:
+            return Markup(
+                f'<img src="{url_for("static", filename="images/" + nombre)}" alt="{escape(alt)}"'
+                f'{atributos_clase} loading="{carga}" decoding="async">'
+            )
+
+        variantes = entrada['variantes']
+        fuentes = []
+        respaldo = None
+        for formato, anchos in self._por_preferencia(variantes):
+            if formato in ('jpg', 'png'):
+                respaldo = anchos
+                continue
+            fuentes.append(
+                f'<source type="{FORMATOS[formato][2]}" srcset="{self._srcset(anchos)}" sizes="{escape(sizes)}">'
+            )
+        mayor = respaldo[max(respaldo)]
+        return Markup(
+            '<picture>' + ''.join(fuentes) +
+            f'<img src="{self._url(mayor)}" srcset="{self._srcset(respaldo)}" sizes="{escape(sizes)}"'
+            f' width="{entrada["ancho"]}" height="{entrada["alto"]}" alt="{escape(alt)}"'
+            f'{atributos_clase} loading="{carga}" decoding="async"></picture>'
+        )
+
+    def imagen_fondo(self, nombre, ancho=1600):
+        """Valor CSS de background-image con image-set() de los formatos generados"""
+        original = url_for('static', filename='images/' + nombre)
+        entrada = self.manifiesto().get(nombre)
+        if not entrada:
+            return Markup(f"url('{original}')")
+        opciones = []
+        for formato, anchos in self._por_preferencia(entrada['variantes']):
+            candidatos = [a for a in anchos if a <= ancho] or [min(anchos)]
+            archivo = anchos[max(candidatos)]
+            opciones.append(f"url('{self._url(archivo)}') type('{FORMATOS[formato][2]}')")
+        return Markup(f"image-set({', '.join(opciones)})")
+
+    def _cabeceras_cache(self, response):
+        # Los archivos generados llevan la huella del contenido en el nombre:
+        # pueden guardarse en caché indefinidamente
+        if request.path.startswith(self.prefijo_inmutable) and response.status_code == 200:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,337 @@
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Producto, Insumo, Cliente, Pedido, DetallePedido
+from servicio_pedidos import ESTADOS_PEDIDO
+
+logger = logging.getLogger('luma.importacion')
+
+# Filas por lote (una consulta de existentes y un executemany por lote)
+LOTE_POR_DEFECTO = 1000
+# Errores por fila que se conservan en memoria para el reporte
+MAX_ERRORES_GUARDADOS = 1000
+
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+class FilaInvalida(Exception):
+    """Una fila del archivo no pasa la validación"""
+
+
+class ResultadoImportacion:
+    """Conteos de una importación y los primeros errores por fila"""
+
+    def __init__(self, al_error=None):
+        self.leidas = 0
+        self.insertadas = 0
+        self.actualizadas = 0
+        self.con_error = 0
+        self.errores = []
+        self.al_error = al_error
+
+    def error(self, linea, mensaje):
+        self.con_error += 1
+        if len(self.errores) < MAX_ERRORES_GUARDADOS:
+            self.errores.append((linea, mensaje))
+        if self.al_error is not None:
+            self.al_error(linea, mensaje)
+
+    def como_dict(self):
+        return {
+            'leidas': self.leidas,
+            'insertadas': self.insertadas,
+            'actualizadas': self.actualizadas,
+            'con_error': self.con_error,
+        }
+
+
+def detectar_formato(nombre):
+    formato = FORMATOS.get(os.path.splitext(nombre or '')[1].lower())
+    if formato is None:
+        raise ValueError('Formato no reconocido: use un archivo .csv o .jsonl')
+    return formato
+
+
+def leer_filas(archivo, formato):
+    """Itera (línea, fila, error) leyendo el archivo de a una línea"""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila, None
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(archivo, 1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError as e:
+                yield numero, None, f'JSON inválido: {e}'
+                continue
+            if not isinstance(fila, dict):
+                yield numero, None, 'Se esperaba un objeto JSON por línea'
+                continue
+            yield numero, fila, None
+    else:
+        raise ValueError(f'Formato desconocido: {formato}')
+
+
+# ---- Validación de campos ----
+
+def _valor(fila, campo):
+    valor = fila.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _texto(fila, campo, maximo, requerido=True):
+    valor = _valor(fila, campo)
+    if valor is None:
+        if requerido:
+            raise FilaInvalida(f'{campo}: obligatorio')
+        return None
+    if len(valor) > maximo:
+        raise FilaInvalida(f'{campo}: máximo {maximo} caracteres')
+    return valor
+
+
+def _entero(fila, campo, requerido=True, minimo=0):
+    valor = _valor(fila, campo)
+    if valor is None:
+        if requerido:
+            raise FilaInvalida(f'{campo}: obligatorio')
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise FilaInvalida(f'{campo}: debe ser un número entero')
+    if numero < minimo:
+        raise FilaInvalida(f'{campo}: debe ser mayor o igual a {minimo}')
+    return numero
+
+
+def _precio(fila, campo, requerido=True):
+    valor = _valor(fila, campo)
+    if valor is None:
+        if requerido:
+            raise FilaInvalida(f'{campo}: obligatorio')
+        return None
+    try:
+        numero = Decimal(valor)
+    except InvalidOperation:
+        raise FilaInvalida(f'{campo}: debe ser un número')
+    if not numero.is_finite() or numero < 0 or numero >= Decimal('1e8'):
+        raise FilaInvalida(f'{campo}: fuera de rango')
+    return numero.quantize(Decimal('0.01'))
+
+
+def _fecha(fila, campo):
+    valor = _valor(fila, campo)
+    if valor is None:
+        raise FilaInvalida(f'{campo}: obligatorio')
+    try:
+        return datetime.fromisoformat(valor.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise FilaInvalida(f'{campo}: fecha inválida (use AAAA-MM-DD o ISO 8601)')
+
+
+def _validar_producto(fila):
+    return {
+        'id_producto': _entero(fila, 'id_producto', requerido=False, minimo=1),
+        'nombre': _texto(fila, 'nombre', 50),
+        'descripcion': _texto(fila, 'descripcion', 65535, requerido=False) or '',
+        'precio': _precio(fila, 'precio'),
+        'stock': _entero(fila, 'stock'),
+    }
+
+
+def _validar_insumo(fila):
+    return {
+        'id_insumo': _entero(fila, 'id_insumo', requerido=False, minimo=1),
+        'nombre': _texto(fila, 'nombre', 50),
+        'descripcion': _texto(fila, 'descripcion', 65535, requerido=False) or '',
+        'cantidad': _entero(fila, 'cantidad'),
+        'unidad': _texto(fila, 'unidad', 20),
+    }
+
+
+def _validar_linea_pedido(fila):
+    estado = _texto(fila, 'estado', 30, requerido=False) or 'entregado'
+    if estado not in ESTADOS_PEDIDO:
+        raise FilaInvalida(f'estado: debe ser uno de {", ".join(ESTADOS_PEDIDO)}')
+    return {
+        'id_pedido': _entero(fila, 'id_pedido', minimo=1),
+        'id_cliente': _entero(fila, 'id_cliente', minimo=1),
+        'fecha': _fecha(fila, 'fecha'),
+        'estado': estado,
+        'id_producto': _entero(fila, 'id_producto', minimo=1),
+        'cantidad': _entero(fila, 'cantidad', minimo=1),
+        # Opcional: sin él se usa el precio actual del producto
+        'precio_unitario': _precio(fila, 'precio_unitario', requerido=False),
+    }
+
+
+# ---- Escritura por lotes ----
+
+def _guardar_catalogo(modelo, columna_id, nombre_id, lote, resultado):
+    """Inserta o actualiza (por id) un lote con una consulta y dos executemany"""
+    # Si un id se repite dentro del lote gana la última fila
+    con_id = {}
+    sin_id = []
+    for _, datos in lote:
+        if datos[nombre_id] is None:
+            sin_id.append({k: v for k, v in datos.items() if k != nombre_id})
+        else:
+            con_id[datos[nombre_id]] = datos
+
+    existentes = set(db.session.scalars(
+        select(columna_id).where(columna_id.in_(con_id))
+    )) if con_id else set()
+    actualizar = [datos for id_, datos in con_id.items() if id_ in existentes]
+    nuevas_con_id = [datos for id_, datos in con_id.items() if id_ not in existentes]
+
+    if actualizar:
+        db.session.execute(update(modelo), actualizar)
+    if nuevas_con_id:
+        db.session.execute(insert(modelo), nuevas_con_id)
+    if sin_id:
+        db.session.execute(insert(modelo), sin_id)
+    resultado.actualizadas += len(actualizar)
+    resultado.insertadas += len(nuevas_con_id) + len(sin_id)
+
+
+def _guardar_productos(lote, resultado):
+    _guardar_catalogo(Producto, Producto.id_producto, 'id_producto', lote, resultado)
+
+
+def _guardar_insumos(lote, resultado):
+    _guardar_catalogo(Insumo, Insumo.id_insumo, 'id_insumo', lote, resultado)
+
+
+def _guardar_pedidos(lote, resultado):
+    """Pedidos históricos: una fila por línea de detalle.
+
+    Los pedidos existentes se actualizan y sus detalles se reemplazan, así
+    reimportar el mismo archivo no duplica nada. No se descuenta stock ni se
+    registra seguimiento: son pedidos ya cerrados en el sistema anterior.
+    """
+    clientes = {linea['id_cliente'] for _, linea in lote}
+    productos = {linea['id_producto'] for _, linea in lote}
+    clientes_validos = set(db.session.scalars(
+        select(Cliente.id_cliente).where(Cliente.id_cliente.in_(clientes))
+    ))
+    precios = dict(db.session.execute(
+        select(Producto.id_producto, Producto.precio).where(Producto.id_producto.in_(productos))
+    ).all())
+
+    pedidos = {}
+    detalles = []
+    for numero, linea in lote:
+        if linea['id_cliente'] not in clientes_validos:
+            resultado.error(numero, f'id_cliente: no existe el cliente {linea["id_cliente"]}')
+            continue
+        if linea['id_producto'] not in precios:
+            resultado.error(numero, f'id_producto: no existe el producto {linea["id_producto"]}')
+            continue
+        # El encabezado del pedido se toma de su primera línea
+        pedido = pedidos.setdefault(linea['id_pedido'], {
+            'id_pedido': linea['id_pedido'],
+            'id_cliente': linea['id_cliente'],
+            'fecha': linea['fecha'],
+            'estado': linea['estado'],
+            'total': Decimal(0),
+            'num_items': 0,
+        })
+        precio = linea['precio_unitario'] if linea['precio_unitario'] is not None else precios[linea['id_producto']]
+        pedido['total'] += precio * linea['cantidad']
+        pedido['num_items'] += 1
+        detalles.append({
+            'id_pedido': linea['id_pedido'],
+            'id_producto': linea['id_producto'],
+            'cantidad': linea['cantidad'],
+            'precio_unitario': precio,
+        })
+    if not pedidos:
+        return
+
+    existentes = set(db.session.scalars(
+        select(Pedido.id_pedido).where(Pedido.id_pedido.in_(pedidos))
+    ))
+    actualizar = [datos for id_, datos in pedidos.items() if id_ in existentes]
+    nuevos = [datos for id_, datos in pedidos.items() if id_ not in existentes]
+    if actualizar:
+        db.session.execute(update(Pedido), actualizar)
+        db.session.execute(
+            delete(DetallePedido)
+            .where(DetallePedido.id_pedido.in_([datos['id_pedido'] for datos in actualizar]))
+            .execution_options(synchronize_session=False)
+        )
+    if nuevos:
+        db.session.execute(insert(Pedido), nuevos)
+    db.session.execute(insert(DetallePedido), detalles)
+    resultado.actualizadas += len(actualizar)
+    resultado.insertadas += len(nuevos)
+
+
+# entidad -> (validar fila, guardar lote, clave que no puede partirse entre lotes)
+ENTIDADES = {
+    'productos': (_validar_producto, _guardar_productos, None),
+    'insumos': (_validar_insumo, _guardar_insumos, None),
+    'pedidos': (_validar_linea_pedido, _guardar_pedidos, 'id_pedido'),
+}
+
+
+def importar(entidad, archivo, formato, lote=LOTE_POR_DEFECTO, al_error=None):
+    """Importa un archivo CSV o JSON Lines en lotes de `lote` filas.
+
+    El archivo se lee en streaming y cada lote se confirma por separado, así
+    la memoria no depende del tamaño del archivo. Las filas inválidas se
+    reportan y se omiten; si un lote falla en la base se reportan todas sus
+    filas y se continúa con el siguiente. En pedidos las líneas de un mismo
+    pedido deben ir consecutivas. Conviene no mezclar filas con y sin id: las
+    creadas sin id pueden recibir un id que aparece más adelante en el archivo.
+    """
+    if entidad not in ENTIDADES:
+        raise ValueError(f'Entidad desconocida: {entidad}')
+    validar, guardar, clave = ENTIDADES[entidad]
+    resultado = ResultadoImportacion(al_error)
+    pendientes = []
+
+    def confirmar():
+        try:
+            guardar(pendientes, resultado)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning('Lote rechazado (líneas %s-%s): %s', pendientes[0][0], pendientes[-1][0], e)
+            mensaje = f'lote rechazado por la base de datos: {e.__class__.__name__}'
+            for numero, _ in pendientes:
+                resultado.error(numero, mensaje)
+        pendientes.clear()
+
+    for numero, fila, error in leer_filas(archivo, formato):
+        resultado.leidas += 1
+        if error is None:
+            try:
+                datos = validar(fila)
+            except FilaInvalida as e:
+                error = str(e)
+        if error is not None:
+            resultado.error(numero, error)
+            continue
+        # Un pedido no se reparte entre dos lotes
+        if len(pendientes) >= lote and (clave is None or pendientes[-1][1][clave] != datos[clave]):
+            confirmar()
+        pendientes.append((numero, datos))
+
+    if pendientes:
+        confirmar()
+    return resultado
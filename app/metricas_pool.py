@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+from sqlalchemy.pool import QueuePool
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class QueuePoolInstrumentado(QueuePool):
+    """QueuePool que mide la espera al obtener conexiones y el uso del pool.
+
+    La espera es solo el tiempo en la cola del pool: no incluye abrir una
+    conexión nueva ni el pre_ping, que se hacen después de obtenerla.
+    """
+
+    # Cantidad de esperas recientes usadas para calcular percentiles
+    MUESTRAS = 1000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        # Tiempo que el hilo actual pasó abriendo conexiones dentro de _do_get
+        self._hilo = threading.local()
+        self._esperas = deque(maxlen=self.MUESTRAS)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._max_en_uso = 0
+
+    def recreate(self):
+        # dispose()/recreate() conservan las métricas acumuladas del proceso
+        nuevo = super().recreate()
+        nuevo._esperas = self._esperas
+        nuevo._checkouts = self._checkouts
+        nuevo._timeouts = self._timeouts
+        nuevo._espera_total = self._espera_total
+        nuevo._espera_max = self._espera_max
+        nuevo._max_en_uso = self._max_en_uso
+        return nuevo
+
+    def _create_connection(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self._hilo.creacion = getattr(self._hilo, 'creacion', 0.0) + time.perf_counter() - inicio
+
+    def _do_get(self):
+        self._hilo.creacion = 0.0
+        inicio = time.perf_counter()
+        try:
+            registro = super()._do_get()
+        except TimeoutPool:
+            with self._lock_metricas:
+                self._timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio - self._hilo.creacion
+        with self._lock_metricas:
+            self._checkouts += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+            self._esperas.append(espera)
+            self._max_en_uso = max(self._max_en_uso, self.checkedout())
+        return registro
+
+    def metricas(self):
+        with self._lock_metricas:
+            esperas = list(self._esperas)
+            return {
+                'tamano': self.size(),
+                'en_uso': self.checkedout(),
+                'disponibles': self.checkedin(),
+                'overflow': self.overflow(),
+                'max_en_uso': self._max_en_uso,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'espera_promedio_ms': round(self._espera_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'espera_p95_ms': round(percentil(esperas, 95) * 1000, 3),
+                'espera_max_ms': round(self._espera_max * 1000, 3),
+            }
+
+
+def metricas_de(pool):
+    """Métricas del pool; para pools no instrumentados solo su estado"""
+    if isinstance(pool, QueuePoolInstrumentado):
+        return pool.metricas()
+    return {'estado': pool.status()}
@@ -0,0 +1,46 @@
+"""indices para filtros y ordenamientos frecuentes
+
+Revision ID: 3f1a2b9c4d10
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a2b9c4d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDICES = [
+    ('ix_empleados_id_usuario', 'empleados', ['id_usuario']),
+    ('ix_clientes_id_usuario', 'clientes', ['id_usuario']),
+    ('ix_pedidos_cliente_fecha', 'pedidos', ['id_cliente', 'fecha']),
+    ('ix_pedidos_fecha_id', 'pedidos', ['fecha', 'id_pedido']),
+    ('ix_pedidos_estado_fecha', 'pedidos', ['estado', 'fecha']),
+    ('ix_detalle_pedido_id_pedido', 'detalle_pedido', ['id_pedido']),
+    ('ix_seguimiento_pedido_fecha', 'seguimiento_pedido', ['id_pedido', 'fecha']),
+]
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    # Las bases creadas con db.create_all() ya tienen los índices declarados
+    # en models.py, por eso solo se crean los que falten
+    for nombre, tabla, columnas in INDICES:
+        if nombre not in _indices_existentes(tabla):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, columnas in reversed(INDICES):
+        if nombre in _indices_existentes(tabla):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,48 @@
+"""lista de materiales producto-insumo, stock mínimo y consumo de insumos
+
+Revision ID: 5a0d9e6c3f24
+Revises: e91f3c7a2b58
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0d9e6c3f24'
+down_revision = 'e91f3c7a2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'insumos_producto',
+        sa.Column('id_producto', sa.Integer(), nullable=False),
+        sa.Column('id_insumo', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id_insumo'], ['insumos.id_insumo']),
+        sa.ForeignKeyConstraint(['id_producto'], ['productos.id_producto']),
+        sa.PrimaryKeyConstraint('id_producto', 'id_insumo')
+    )
+    op.create_index('ix_insumos_producto_id_insumo', 'insumos_producto', ['id_insumo'])
+
+    with op.batch_alter_table('insumos') as batch_op:
+        batch_op.add_column(sa.Column('stock_minimo', sa.Integer(), nullable=False, server_default='0'))
+
+    # Los pedidos existentes no se marcan: solo consumen insumos al pasar de
+    # un estado previo a producción a uno posterior
+    with op.batch_alter_table('pedidos') as batch_op:
+        batch_op.add_column(sa.Column('insumos_consumidos', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('pedidos') as batch_op:
+        batch_op.drop_column('insumos_consumidos')
+
+    with op.batch_alter_table('insumos') as batch_op:
+        batch_op.drop_column('stock_minimo')
+
+    op.drop_index('ix_insumos_producto_id_insumo', table_name='insumos_producto')
+    op.drop_table('insumos_producto')
@@ -0,0 +1,42 @@
+"""bandeja de salida de notificaciones
+
+Revision ID: 7b2e41d9c5a3
+Revises: 3f1a2b9c4d10
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e41d9c5a3'
+down_revision = '3f1a2b9c4d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notificaciones',
+        sa.Column('id_notificacion', sa.Integer(), nullable=False),
+        sa.Column('clave', sa.String(length=150), nullable=False),
+        sa.Column('destinatario', sa.String(length=100), nullable=False),
+        sa.Column('asunto', sa.String(length=200), nullable=False),
+        sa.Column('cuerpo', sa.Text(), nullable=False),
+        sa.Column('responder_a', sa.String(length=100), nullable=True),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('intentos', sa.Integer(), nullable=False),
+        sa.Column('proximo_intento', sa.DateTime(), nullable=False),
+        sa.Column('ultimo_error', sa.Text(), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+        sa.Column('fecha_envio', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id_notificacion'),
+        sa.UniqueConstraint('clave')
+    )
+    op.create_index('ix_notificaciones_estado_intento', 'notificaciones', ['estado', 'proximo_intento'])
+
+
+def downgrade():
+    op.drop_index('ix_notificaciones_estado_intento', table_name='notificaciones')
+    op.drop_table('notificaciones')
@@ -0,0 +1,73 @@
+"""índices de búsqueda de texto (FULLTEXT ngram en MySQL, FTS5 en SQLite)
+
+Revision ID: 9c3b7d1e4f60
+Revises: 5a0d9e6c3f24
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3b7d1e4f60'
+down_revision = '5a0d9e6c3f24'
+branch_labels = None
+depends_on = None
+
+# tabla -> (clave, columnas indexadas); igual que busqueda.INDICES
+INDICES = {
+    'productos': ('id_producto', ('nombre', 'descripcion')),
+    'usuarios': ('id_usuario', ('nombre', 'correo')),
+    'clientes': ('id_cliente', ('telefono',)),
+    'seguimiento_pedido': ('id_seguimiento', ('comentario',)),
+}
+
+
+def _ddl_sqlite(tabla, clave, columnas):
+    fts = f'{tabla}_fts'
+    lista = ', '.join(columnas)
+    nuevos = ', '.join(f'new.{columna}' for columna in columnas)
+    viejos = ', '.join(f'old.{columna}' for columna in columnas)
+    borrar = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.{clave}, {viejos});"
+    insertar = f'INSERT INTO {fts}(rowid, {lista}) VALUES (new.{clave}, {nuevos});'
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({lista}, content='{tabla}', "
+        f"content_rowid='{clave}', tokenize='trigram')",
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN {borrar} END',
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabla} BEGIN {borrar} {insertar} END',
+        # Indexa las filas existentes
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    op.create_index('ix_detalle_pedido_producto_pedido', 'detalle_pedido', ['id_producto', 'id_pedido'])
+
+    dialecto = op.get_bind().dialect.name
+    if dialecto == 'mysql':
+        # InnoDB construye el índice sobre las filas existentes y lo mantiene
+        # en cada escritura
+        for tabla, (_, columnas) in INDICES.items():
+            op.create_index(f'ft_{tabla}', tabla, list(columnas),
+                            mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    elif dialecto == 'sqlite':
+        # Nota: batch_alter_table recrea la tabla en SQLite y descarta sus
+        # triggers; una migración futura sobre estas tablas debe recrearlos
+        for tabla, (clave, columnas) in INDICES.items():
+            for sentencia in _ddl_sqlite(tabla, clave, columnas):
+                op.execute(sentencia)
+
+
+def downgrade():
+    dialecto = op.get_bind().dialect.name
+    if dialecto == 'mysql':
+        for tabla in INDICES:
+            op.drop_index(f'ft_{tabla}', table_name=tabla)
+    elif dialecto == 'sqlite':
+        for tabla in INDICES:
+            for sufijo in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {tabla}_fts_{sufijo}')
+            op.execute(f'DROP TABLE IF EXISTS {tabla}_fts')
+
+    op.drop_index('ix_detalle_pedido_producto_pedido', table_name='detalle_pedido')
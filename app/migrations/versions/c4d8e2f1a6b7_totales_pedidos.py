@@ -0,0 +1,38 @@
+"""totales desnormalizados de pedidos y precio unitario de los detalles
+
+Revision ID: c4d8e2f1a6b7
+Revises: 7b2e41d9c5a3
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e2f1a6b7'
+down_revision = '7b2e41d9c5a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las columnas se agregan vacías; los valores se completan por lotes con
+    # `flask luma totales` para no bloquear tablas grandes en la migración
+    with op.batch_alter_table('pedidos') as batch_op:
+        batch_op.add_column(sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('num_items', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_pedidos_total_id', 'pedidos', ['total', 'id_pedido'])
+
+    with op.batch_alter_table('detalle_pedido') as batch_op:
+        batch_op.add_column(sa.Column('precio_unitario', sa.Numeric(precision=10, scale=2), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('detalle_pedido') as batch_op:
+        batch_op.drop_column('precio_unitario')
+
+    op.drop_index('ix_pedidos_total_id', table_name='pedidos')
+    with op.batch_alter_table('pedidos') as batch_op:
+        batch_op.drop_column('num_items')
+        batch_op.drop_column('total')
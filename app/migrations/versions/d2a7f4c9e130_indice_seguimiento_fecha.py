@@ -0,0 +1,23 @@
+"""índice por fecha de seguimiento_pedido para la actualización incremental de reportes
+
+Revision ID: d2a7f4c9e130
+Revises: 9c3b7d1e4f60
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f4c9e130'
+down_revision = '9c3b7d1e4f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_seguimiento_fecha', 'seguimiento_pedido', ['fecha', 'id_pedido'])
+
+
+def downgrade():
+    op.drop_index('ix_seguimiento_fecha', table_name='seguimiento_pedido')
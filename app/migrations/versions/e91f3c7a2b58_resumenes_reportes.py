@@ -0,0 +1,64 @@
+"""tablas de resumen para reportes de ventas y producción
+
+Revision ID: e91f3c7a2b58
+Revises: c4d8e2f1a6b7
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91f3c7a2b58'
+down_revision = 'c4d8e2f1a6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Se crean vacías: `flask luma rollup` las llena la primera vez desde el
+    # pedido más antiguo
+    op.create_table(
+        'resumen_ventas_producto',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('id_producto', sa.Integer(), nullable=False),
+        sa.Column('pedidos', sa.Integer(), nullable=False),
+        sa.Column('unidades', sa.Integer(), nullable=False),
+        sa.Column('ingresos', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'id_producto')
+    )
+    op.create_table(
+        'resumen_pedidos_estado',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('estado', sa.String(length=30), nullable=False),
+        sa.Column('pedidos', sa.Integer(), nullable=False),
+        sa.Column('monto', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'estado')
+    )
+    op.create_table(
+        'resumen_transiciones',
+        sa.Column('id_resumen', sa.Integer(), nullable=False),
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('id_empleado', sa.Integer(), nullable=True),
+        sa.Column('estado_anterior', sa.String(length=30), nullable=True),
+        sa.Column('estado', sa.String(length=30), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id_resumen')
+    )
+    op.create_index('ix_resumen_transiciones_dia', 'resumen_transiciones', ['dia'])
+    op.create_table(
+        'resumen_marcas',
+        sa.Column('nombre', sa.String(length=30), nullable=False),
+        sa.Column('marca', sa.DateTime(), nullable=False),
+        sa.Column('fecha_actualizacion', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('nombre')
+    )
+
+
+def downgrade():
+    op.drop_table('resumen_marcas')
+    op.drop_index('ix_resumen_transiciones_dia', table_name='resumen_transiciones')
+    op.drop_table('resumen_transiciones')
+    op.drop_table('resumen_pedidos_estado')
+    op.drop_table('resumen_ventas_producto')
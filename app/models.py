@@ -1,9 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 from flask_login import UserMixin
 
-db = SQLAlchemy()
+from contrasenas import contrasenas
+from replicas import SesionEnrutada
+
+# Las vistas de solo lectura leen de la réplica si hay una configurada
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 
 class TipoUsuario(db.Model):
@@ -17,6 +21,11 @@ class TipoUsuario(db.Model):
 
 class Usuario(UserMixin, db.Model):
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        # Búsqueda (busqueda.py); en SQLite la reemplaza una tabla FTS5
+        db.Index('ft_usuarios', 'nombre', 'correo',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     id_usuario = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(50), nullable=False)
     correo = db.Column(db.String(100), unique=True, nullable=False)
@@ -33,10 +42,16 @@ class Usuario(UserMixin, db.Model):
         return str(self.id_usuario)
 
     def set_password(self, password):
-        self.contrasena_hash = generate_password_hash(password)
+        self.contrasena_hash = contrasenas.generar(password)
 
     def check_password(self, password):
-        return check_password_hash(self.contrasena_hash, password)
+        """Verifica la contraseña y, si el hash usa parámetros anteriores, lo
+        recalcula con los actuales (el llamador hace commit)"""
+        if not contrasenas.verificar(self.contrasena_hash, password):
+            return False
+        if contrasenas.necesita_rehash(self.contrasena_hash):
+            self.set_password(password)
+        return True
 
     @property
     def is_admin(self):
@@ -50,8 +65,56 @@ class Usuario(UserMixin, db.Model):
     def is_cliente(self):
         return self.tipo_usuario and self.tipo_usuario.nombre == 'cliente'
 
+class UsuarioSesion(UserMixin):
+    """Datos del usuario autenticado que se guardan en caché entre peticiones.
+
+    Es una copia de solo lectura (no un objeto ORM), así puede compartirse
+    entre sesiones de base de datos sin cargas perezosas.
+    """
+
+    def __init__(self, id_usuario, nombre, correo, activo, rol):
+        self.id_usuario = id_usuario
+        self.nombre = nombre
+        self.correo = correo
+        self.activo = activo
+        self.rol = rol
+
+    def get_id(self):
+        return str(self.id_usuario)
+
+    @property
+    def is_admin(self):
+        return self.rol == 'admin'
+
+    @property
+    def is_empleado(self):
+        return self.rol == 'empleado'
+
+    @property
+    def is_cliente(self):
+        return self.rol == 'cliente'
+
+    @staticmethod
+    def consulta(id_usuario):
+        """Usuario y nombre de su rol en una sola consulta"""
+        return (
+            db.select(Usuario.id_usuario, Usuario.nombre, Usuario.correo,
+                      Usuario.activo, TipoUsuario.nombre)
+            .outerjoin(TipoUsuario, Usuario.id_tipo == TipoUsuario.id_tipo)
+            .where(Usuario.id_usuario == id_usuario)
+        )
+
+    @classmethod
+    def cargar(cls, id_usuario):
+        fila = db.session.execute(cls.consulta(id_usuario)).first()
+        return cls(*fila) if fila else None
+
+
 class Empleado(db.Model):
     __tablename__ = 'empleados'
+    __table_args__ = (
+        db.Index('ix_empleados_id_usuario', 'id_usuario'),
+    )
     id_empleado = db.Column(db.Integer, primary_key=True)
     id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False)
     puesto = db.Column(db.String(50), nullable=True)
@@ -61,6 +124,11 @@ class Empleado(db.Model):
 
 class Cliente(db.Model):
     __tablename__ = 'clientes'
+    __table_args__ = (
+        db.Index('ix_clientes_id_usuario', 'id_usuario'),
+        db.Index('ft_clientes', 'telefono',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     id_cliente = db.Column(db.Integer, primary_key=True)
     id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False)
     telefono = db.Column(db.String(20), nullable=True)
@@ -70,12 +138,17 @@ class Cliente(db.Model):
 
 class Producto(db.Model):
     __tablename__ = 'productos'
+    __table_args__ = (
+        db.Index('ft_productos', 'nombre', 'descripcion',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     id_producto = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(50), nullable=False)
     descripcion = db.Column(db.Text, nullable=True)
     precio = db.Column(db.Numeric(10,2), nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     detalles = db.relationship('DetallePedido', back_populates='producto')
+    insumos = db.relationship('InsumoProducto', back_populates='producto', cascade='all, delete-orphan')
 
 class Insumo(db.Model):
     __tablename__ = 'insumos'
@@ -84,30 +157,98 @@ class Insumo(db.Model):
     descripcion = db.Column(db.Text, nullable=True)
     cantidad = db.Column(db.Integer, nullable=False)
     unidad = db.Column(db.String(20), nullable=False)
+    # Por debajo de este valor se avisa al consumirlo (0 = sin aviso)
+    stock_minimo = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    productos = db.relationship('InsumoProducto', back_populates='insumo', cascade='all, delete-orphan')
+
+    @property
+    def bajo_minimo(self):
+        return self.cantidad < self.stock_minimo
+
+class InsumoProducto(db.Model):
+    """Lista de materiales: insumo que consume cada unidad de un producto"""
+    __tablename__ = 'insumos_producto'
+    id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), primary_key=True)
+    # Consumo y proyección agrupan por insumo
+    id_insumo = db.Column(db.Integer, db.ForeignKey('insumos.id_insumo'), primary_key=True, index=True)
+    # En la unidad del insumo, por unidad de producto
+    cantidad = db.Column(db.Integer, nullable=False)
+
+    producto = db.relationship('Producto', back_populates='insumos')
+    insumo = db.relationship('Insumo', back_populates='productos')
 
 class Pedido(db.Model):
     __tablename__ = 'pedidos'
+    __table_args__ = (
+        # mis_pedidos: filtro por cliente ordenado por fecha
+        db.Index('ix_pedidos_cliente_fecha', 'id_cliente', 'fecha'),
+        # listados paginados por (fecha, id_pedido)
+        db.Index('ix_pedidos_fecha_id', 'fecha', 'id_pedido'),
+        # conteos y filtros por estado
+        db.Index('ix_pedidos_estado_fecha', 'estado', 'fecha'),
+        # listados ordenados por monto
+        db.Index('ix_pedidos_total_id', 'total', 'id_pedido'),
+    )
     id_pedido = db.Column(db.Integer, primary_key=True)
     id_cliente = db.Column(db.Integer, db.ForeignKey('clientes.id_cliente'), nullable=False)
     fecha = db.Column(db.DateTime, nullable=False)
     estado = db.Column(db.String(30), nullable=False)
+    # Desnormalizados: se mantienen al crear o editar los detalles
+    # (servicio_pedidos) y se recalculan con `flask luma totales`
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
+    num_items = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Se marca al descontar los insumos para no consumirlos dos veces
+    insumos_consumidos = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     cliente = db.relationship('Cliente', back_populates='pedidos')
     detalles = db.relationship('DetallePedido', back_populates='pedido')
     seguimientos = db.relationship('SeguimientoPedido', back_populates='pedido')
 
+    @classmethod
+    def query_con_relaciones(cls):
+        """Consulta de pedidos que carga cliente, usuario, detalles y productos
+        en un número fijo de consultas (evita el N+1 en las plantillas)"""
+        return cls.query.options(
+            joinedload(cls.cliente).joinedload(Cliente.usuario),
+            selectinload(cls.detalles).joinedload(DetallePedido.producto)
+        )
+
 class DetallePedido(db.Model):
     __tablename__ = 'detalle_pedido'
+    __table_args__ = (
+        db.Index('ix_detalle_pedido_id_pedido', 'id_pedido'),
+        # Pedidos recientes que contienen un producto (búsqueda)
+        db.Index('ix_detalle_pedido_producto_pedido', 'id_producto', 'id_pedido'),
+    )
     id_detalle = db.Column(db.Integer, primary_key=True)
     id_pedido = db.Column(db.Integer, db.ForeignKey('pedidos.id_pedido'), nullable=False)
     id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), nullable=False)
     cantidad = db.Column(db.Integer, nullable=False)
+    # Precio del producto al momento del pedido
+    precio_unitario = db.Column(db.Numeric(10, 2), nullable=True)
 
     pedido = db.relationship('Pedido', back_populates='detalles')
     producto = db.relationship('Producto', back_populates='detalles')
 
+    @property
+    def precio(self):
+        # Detalles anteriores a la columna sin completar: precio actual
+        return self.precio_unitario if self.precio_unitario is not None else self.producto.precio
+
+    @property
+    def subtotal(self):
+        return self.cantidad * self.precio
+
 class SeguimientoPedido(db.Model):
     __tablename__ = 'seguimiento_pedido'
+    __table_args__ = (
+        # rastrear_pedido: historial de un pedido ordenado por fecha
+        db.Index('ix_seguimiento_pedido_fecha', 'id_pedido', 'fecha'),
+        # Actualización incremental de los reportes: seguimientos desde una marca
+        db.Index('ix_seguimiento_fecha', 'fecha', 'id_pedido'),
+        db.Index('ft_seguimiento_pedido', 'comentario',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     id_seguimiento = db.Column(db.Integer, primary_key=True)
     id_pedido = db.Column(db.Integer, db.ForeignKey('pedidos.id_pedido'), nullable=False)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -116,4 +257,67 @@ class SeguimientoPedido(db.Model):
     comentario = db.Column(db.Text, nullable=True)
 
     pedido = db.relationship('Pedido', back_populates='seguimientos')
-    empleado = db.relationship('Empleado', back_populates='seguimientos')
\ No newline at end of file
+    empleado = db.relationship('Empleado', back_populates='seguimientos')
+
+class Notificacion(db.Model):
+    """Bandeja de salida de correos; se envían en segundo plano (flask luma notificaciones)"""
+    __tablename__ = 'notificaciones'
+    __table_args__ = (
+        # El proceso de envío busca pendientes cuyo próximo intento ya venció
+        db.Index('ix_notificaciones_estado_intento', 'estado', 'proximo_intento'),
+    )
+    id_notificacion = db.Column(db.Integer, primary_key=True)
+    # Evita encolar dos veces el mismo aviso (p. ej. un formulario reenviado)
+    clave = db.Column(db.String(150), unique=True, nullable=False)
+    destinatario = db.Column(db.String(100), nullable=False)
+    asunto = db.Column(db.String(200), nullable=False)
+    cuerpo = db.Column(db.Text, nullable=False)
+    responder_a = db.Column(db.String(100), nullable=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_error = db.Column(db.Text, nullable=True)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fecha_envio = db.Column(db.DateTime, nullable=True)
+
+# ---- Tablas de resumen para reportes (se llenan con `flask luma rollup`, ver reportes.py) ----
+
+class ResumenVentaProducto(db.Model):
+    """Ventas por día y producto, sin pedidos cancelados"""
+    __tablename__ = 'resumen_ventas_producto'
+    dia = db.Column(db.Date, primary_key=True)
+    # Sin clave foránea: el resumen no bloquea cambios en el catálogo
+    id_producto = db.Column(db.Integer, primary_key=True)
+    pedidos = db.Column(db.Integer, nullable=False)
+    unidades = db.Column(db.Integer, nullable=False)
+    ingresos = db.Column(db.Numeric(14, 2), nullable=False)
+
+class ResumenPedidosEstado(db.Model):
+    """Pedidos por día de creación y estado actual"""
+    __tablename__ = 'resumen_pedidos_estado'
+    dia = db.Column(db.Date, primary_key=True)
+    estado = db.Column(db.String(30), primary_key=True)
+    pedidos = db.Column(db.Integer, nullable=False)
+    monto = db.Column(db.Numeric(14, 2), nullable=False)
+
+class ResumenTransicion(db.Model):
+    """Cambios de estado registrados por día, empleado y transición"""
+    __tablename__ = 'resumen_transiciones'
+    __table_args__ = (
+        db.Index('ix_resumen_transiciones_dia', 'dia'),
+    )
+    id_resumen = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    # NULL: pedidos creados por el cliente o sin empleado asociado
+    id_empleado = db.Column(db.Integer, nullable=True)
+    # NULL: primer seguimiento del pedido
+    estado_anterior = db.Column(db.String(30), nullable=True)
+    estado = db.Column(db.String(30), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+
+class MarcaResumen(db.Model):
+    """Hasta qué fecha de origen están procesadas las tablas de resumen"""
+    __tablename__ = 'resumen_marcas'
+    nombre = db.Column(db.String(30), primary_key=True)
+    marca = db.Column(db.DateTime, nullable=False)
+    fecha_actualizacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import smtplib
+import time
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Notificacion
+
+logger = logging.getLogger('luma.notificaciones')
+
+MAX_INTENTOS = 6
+# Espera antes del reintento n: BACKOFF_BASE * 2^(n-1), con tope
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=2)
+# Sin clave explícita, un mismo correo repetido dentro de esta ventana (doble
+# envío, reintento del navegador) se considera duplicado
+VENTANA_DUPLICADOS = timedelta(minutes=10)
+
+
+def encolar(destinatario, asunto, cuerpo, clave=None, responder_a=None):
+    """Agrega un correo a la bandeja de salida dentro de la transacción actual.
+
+    No hace commit: se confirma junto con el cambio que lo originó. Si ya
+    existe una notificación con la misma clave no se duplica y devuelve
+    False. Sin `clave`, se deriva del contenido y del tramo de
+    VENTANA_DUPLICADOS en curso: el mismo correo vuelve a enviarse más tarde.
+    """
+    if clave is None:
+        tramo = int(time.time() // VENTANA_DUPLICADOS.total_seconds())
+        clave = 'sha256:' + hashlib.sha256(
+            f'{tramo}\n{destinatario}\n{asunto}\n{cuerpo}'.encode()
+        ).hexdigest()
+    try:
+        with db.session.begin_nested():
+            db.session.add(Notificacion(
+                clave=clave,
+                destinatario=destinatario,
+                asunto=asunto,
+                cuerpo=cuerpo,
+                responder_a=responder_a,
+            ))
+    except IntegrityError:
+        logger.info('Notificación duplicada omitida: %s', clave)
+        return False
+    return True
+
+
+def _espera(intentos):
+    return min(BACKOFF_BASE * (2 ** (intentos - 1)), BACKOFF_MAX)
+
+
+def enviar_pendientes(mail, lote=50):
+    """Envía hasta `lote` notificaciones vencidas reutilizando una conexión SMTP.
+
+    Las filas se bloquean con SKIP LOCKED (en MySQL) para que varios procesos
+    de envío no tomen las mismas. Devuelve (enviadas, fallidas).
+    """
+    ahora = datetime.utcnow()
+    pendientes = db.session.scalars(
+        select(Notificacion)
+        .where(Notificacion.estado == 'pendiente', Notificacion.proximo_intento <= ahora)
+        .order_by(Notificacion.proximo_intento)
+        .limit(lote)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not pendientes:
+        db.session.rollback()
+        return 0, 0
+
+    enviadas = fallidas = 0
+    intentadas = set()
+    try:
+        with mail.connect() as conexion:
+            for notificacion in pendientes:
+                intentadas.add(notificacion.id_notificacion)
+                try:
+                    conexion.send(Message(
+                        subject=notificacion.asunto,
+                        recipients=[notificacion.destinatario],
+                        body=notificacion.cuerpo,
+                        reply_to=notificacion.responder_a,
+                    ))
+                except Exception as error:
+                    _registrar_fallo(notificacion, error, ahora)
+                    fallidas += 1
+                else:
+                    notificacion.estado = 'enviado'
+                    notificacion.fecha_envio = datetime.utcnow()
+                    notificacion.ultimo_error = None
+                    enviadas += 1
+    except (smtplib.SMTPException, OSError) as error:
+        # No se pudo conectar con el servidor SMTP: se reprograma lo no intentado
+        for notificacion in pendientes:
+            if notificacion.id_notificacion not in intentadas:
+                _registrar_fallo(notificacion, error, ahora)
+                fallidas += 1
+    db.session.commit()
+    return enviadas, fallidas
+
+
+def _registrar_fallo(notificacion, error, ahora):
+    notificacion.intentos += 1
+    notificacion.ultimo_error = str(error)[:1000]
+    if notificacion.intentos >= MAX_INTENTOS:
+        notificacion.estado = 'fallido'
+        logger.error('Notificación %s descartada tras %s intentos: %s',
+                     notificacion.id_notificacion, notificacion.intentos, error)
+    else:
+        notificacion.proximo_intento = ahora + _espera(notificacion.intentos)
+        logger.warning('Fallo al enviar notificación %s (intento %s): %s',
+                       notificacion.id_notificacion, notificacion.intentos, error)
+
+
+def procesar_continuamente(mail, lote=50, intervalo=5):
+    """Bucle del proceso de envío: vacía la bandeja y espera `intervalo` segundos"""
+    while True:
+        enviadas, fallidas = enviar_pendientes(mail, lote)
+        if enviadas or fallidas:
+            logger.info('Notificaciones enviadas: %s, fallidas: %s', enviadas, fallidas)
+        # Si el lote salió lleno puede haber más pendientes: seguir sin esperar
+        if enviadas + fallidas < lote:
+            time.sleep(intervalo)
@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import request
+from sqlalchemy import tuple_
+
+# Tamaño de página por defecto y máximo permitido vía ?por_pagina=
+POR_PAGINA_DEFECTO = 50
+POR_PAGINA_MAX = 200
+
+
+class Pagina:
+    """Resultado de una consulta paginada por cursor"""
+
+    def __init__(self, items, siguiente=None, anterior=None, por_pagina=POR_PAGINA_DEFECTO):
+        self.items = items
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.por_pagina = por_pagina
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _codificar_cursor(valores):
+    datos = [v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, Decimal) else v
+             for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, columnas):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if len(datos) != len(columnas):
+            return None
+        valores = []
+        for columna, valor in zip(columnas, datos):
+            if columna.type.python_type is datetime:
+                valor = datetime.fromisoformat(valor)
+            elif columna.type.python_type is Decimal:
+                valor = Decimal(valor)
+            valores.append(valor)
+        return valores
+    except (ValueError, TypeError, NotImplementedError, ArithmeticError):
+        return None
+
+
+def _por_pagina():
+    try:
+        por_pagina = int(request.args.get('por_pagina', POR_PAGINA_DEFECTO))
+    except (ValueError, TypeError):
+        por_pagina = POR_PAGINA_DEFECTO
+    return max(1, min(por_pagina, POR_PAGINA_MAX))
+
+
+def paginar(query, columnas, descendente=False):
+    """Paginación por cursor (keyset) sobre las columnas indicadas.
+
+    Las columnas deben identificar la fila de forma única (terminar en la
+    clave primaria) para que el orden sea estable. Los cursores se leen de
+    ?despues= y ?antes=, de modo que el costo de cada página no depende de
+    cuántas filas tenga la tabla.
+    """
+    por_pagina = _por_pagina()
+    clave = tuple_(*columnas)
+
+    despues = request.args.get('despues')
+    antes = request.args.get('antes')
+    valores_despues = _decodificar_cursor(despues, columnas) if despues else None
+    valores_antes = _decodificar_cursor(antes, columnas) if antes else None
+
+    if valores_antes is not None:
+        # Se recorre en sentido inverso y luego se restablece el orden
+        filtro = clave > tuple_(*valores_antes) if descendente else clave < tuple_(*valores_antes)
+        orden = [c.asc() if descendente else c.desc() for c in columnas]
+        filas = query.filter(filtro).order_by(*orden).limit(por_pagina + 1).all()
+        hay_mas = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        filas.reverse()
+        anterior = _cursor_de(filas[0], columnas) if hay_mas and filas else None
+        siguiente = _cursor_de(filas[-1], columnas) if filas else None
+    else:
+        if valores_despues is not None:
+            filtro = clave < tuple_(*valores_despues) if descendente else clave > tuple_(*valores_despues)
+            query = query.filter(filtro)
+        orden = [c.desc() if descendente else c.asc() for c in columnas]
+        filas = query.order_by(*orden).limit(por_pagina + 1).all()
+        hay_mas = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        siguiente = _cursor_de(filas[-1], columnas) if hay_mas and filas else None
+        anterior = _cursor_de(filas[0], columnas) if valores_despues is not None and filas else None
+
+    return Pagina(filas, siguiente=siguiente, anterior=anterior, por_pagina=por_pagina)
+
+
+def _cursor_de(fila, columnas):
+    return _codificar_cursor([getattr(fila, c.key) for c in columnas])
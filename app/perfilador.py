@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metricas_pool import percentil
+
+logger = logging.getLogger('luma.perfil')
+
+# Peticiones recientes por endpoint que se guardan para calcular percentiles
+MUESTRAS_POR_ENDPOINT = 500
+# Consultas más lentas que se conservan por petición
+CONSULTAS_LENTAS_POR_PETICION = 5
+
+
+class Perfilador:
+    """Mide consultas SQL y tiempo total por petición (opcional, PERFIL_SQL=true).
+
+    Agrega Server-Timing a cada respuesta, registra en el log 'luma.perfil'
+    las peticiones que superan PERFIL_UMBRAL_MS y guarda muestras por
+    endpoint para el resumen de /admin/perfil.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._muestras = defaultdict(lambda: deque(maxlen=MUESTRAS_POR_ENDPOINT))
+        self.umbral_ms = 500
+        self.activo = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.activo = bool(app.config.get('PERFIL_SQL'))
+        self.umbral_ms = float(app.config.get('PERFIL_UMBRAL_MS', 500))
+        app.extensions['perfilador'] = self
+        if not self.activo:
+            return
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        if not event.contains(Engine, 'before_cursor_execute', _antes_de_consulta):
+            event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+            event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+
+    def _iniciar(self):
+        g.perfil_sql = {
+            'inicio': time.perf_counter(),
+            'consultas': 0,
+            'tiempo_sql': 0.0,
+            'lentas': [],
+        }
+
+    def _finalizar(self, response):
+        perfil = g.pop('perfil_sql', None)
+        if perfil is None:
+            return response
+        total_ms = (time.perf_counter() - perfil['inicio']) * 1000
+        sql_ms = perfil['tiempo_sql'] * 1000
+        endpoint = request.endpoint or 'desconocido'
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={sql_ms:.1f};desc="{perfil["consultas"]} consultas", app;dur={total_ms:.1f}'
+        )
+
+        with self._lock:
+            self._muestras[endpoint].append((total_ms, sql_ms, perfil['consultas']))
+
+        if total_ms >= self.umbral_ms:
+            logger.warning(json.dumps({
+                'evento': 'peticion_lenta',
+                'endpoint': endpoint,
+                'metodo': request.method,
+                'ruta': request.path,
+                'estado': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'sql_ms': round(sql_ms, 1),
+                'consultas': perfil['consultas'],
+                'consultas_lentas': [
+                    {'ms': round(ms, 1), 'sql': sql} for ms, sql in perfil['lentas']
+                ],
+            }, ensure_ascii=False))
+        return response
+
+    def resumen(self):
+        """p50/p95 de tiempo total y SQL por endpoint, ordenado por p95"""
+        with self._lock:
+            copia = {endpoint: list(muestras) for endpoint, muestras in self._muestras.items()}
+        filas = []
+        for endpoint, muestras in copia.items():
+            totales = [m[0] for m in muestras]
+            sqls = [m[1] for m in muestras]
+            consultas = [m[2] for m in muestras]
+            filas.append({
+                'endpoint': endpoint,
+                'peticiones': len(muestras),
+                'total_p50_ms': round(percentil(totales, 50), 1),
+                'total_p95_ms': round(percentil(totales, 95), 1),
+                'sql_p50_ms': round(percentil(sqls, 50), 1),
+                'sql_p95_ms': round(percentil(sqls, 95), 1),
+                'consultas_promedio': round(sum(consultas) / len(consultas), 1),
+                'consultas_max': max(consultas),
+            })
+        filas.sort(key=lambda fila: fila['total_p95_ms'], reverse=True)
+        return filas
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    # El inicio va en el contexto de ejecución: si la sentencia falla se
+    # descarta con él en lugar de quedar acumulado en la conexión
+    if context is not None and has_request_context() and 'perfil_sql' in g:
+        context.perfil_inicio = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, 'perfil_inicio', None)
+    if inicio is None or not has_request_context():
+        return
+    duracion = time.perf_counter() - inicio
+    perfil = g.get('perfil_sql')
+    if perfil is None:
+        return
+    perfil['consultas'] += 1
+    perfil['tiempo_sql'] += duracion
+    lentas = perfil['lentas']
+    lentas.append((duracion * 1000, statement))
+    if len(lentas) > CONSULTAS_LENTAS_POR_PETICION:
+        lentas.sort(key=lambda consulta: consulta[0], reverse=True)
+        del lentas[CONSULTAS_LENTAS_POR_PETICION:]
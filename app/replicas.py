@@ -0,0 +1,91 @@
+import time
+from functools import wraps
+
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# Nombre del bind de SQLALCHEMY_BINDS que apunta a la réplica
+BIND_REPLICA = 'replica'
+# Clave de la sesión de Flask con la hora de la última escritura del usuario
+CLAVE_ESCRITURA = '_ultima_escritura'
+
+
+class SesionEnrutada(Session):
+    """Sesión que envía los SELECT a la réplica durante las vistas de solo lectura.
+
+    Las escrituras (flush, INSERT/UPDATE/DELETE) y todo lo que ocurre fuera
+    de una vista marcada con @solo_lectura usan la base primaria.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and _usar_replica()
+                and (clause is None or isinstance(clause, Select))):
+            replica = self._db.engines.get(BIND_REPLICA)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _usar_replica():
+    return has_request_context() and g.get('usar_replica', False)
+
+
+def _anotar_escritura():
+    if has_request_context():
+        g.hubo_escritura = True
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _escritura_orm(sesion, flush_context):
+    _anotar_escritura()
+
+
+@event.listens_for(SesionEnrutada, 'do_orm_execute')
+def _escritura_masiva(orm_execute_state):
+    # update()/insert()/delete() ejecutados con db.session.execute
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _anotar_escritura()
+
+
+class EnrutadorReplicas:
+    """Lecturas en la réplica para las vistas marcadas con @solo_lectura.
+
+    Tras una escritura, el mismo usuario sigue leyendo de la primaria durante
+    DB_REPLICA_STICKY_SECONDS (la hora queda en su cookie de sesión): así ve
+    lo que acaba de escribir aunque la réplica esté atrasada, por ejemplo en
+    mis_pedidos justo después de realizar_pedido.
+    """
+
+    def __init__(self, app=None):
+        self.ventana = 10
+        self.activo = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ventana = float(app.config.get('DB_REPLICA_STICKY_SECONDS', self.ventana))
+        self.activo = BIND_REPLICA in (app.config.get('SQLALCHEMY_BINDS') or {})
+        app.extensions['replicas'] = self
+        if self.activo:
+            # Sin réplica no hace falta la hora de escritura: la sesión no se
+            # toca (ni se reenvía la cookie) en cada escritura
+            app.after_request(self._recordar_escritura)
+
+    def _recordar_escritura(self, respuesta):
+        if g.get('hubo_escritura'):
+            session[CLAVE_ESCRITURA] = time.time()
+        return respuesta
+
+    def reciente(self):
+        """True si el usuario escribió dentro de la ventana de permanencia"""
+        return time.time() - session.get(CLAVE_ESCRITURA, 0) < self.ventana
+
+    def solo_lectura(self, vista):
+        """Decorador de vistas: sus GET leen de la réplica"""
+        @wraps(vista)
+        def vista_en_replica(*args, **kwargs):
+            g.usar_replica = (self.activo and request.method in ('GET', 'HEAD') and not self.reciente())
+            return vista(*args, **kwargs)
+        return vista_en_replica
@@ -0,0 +1,292 @@
+import logging
+import time
+from datetime import date, datetime, time as hora, timedelta
+
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.orm import aliased
+
+from models import (
+    db, Pedido, DetallePedido, Producto, SeguimientoPedido, Empleado, Usuario,
+    ResumenVentaProducto, ResumenPedidosEstado, ResumenTransicion, MarcaResumen,
+)
+
+logger = logging.getLogger('luma.reportes')
+
+# Días consecutivos que se recalculan por transacción
+DIAS_POR_LOTE = 31
+# Estados que no cuentan como venta
+ESTADOS_SIN_VENTA = ('cancelado',)
+
+
+# ---- Actualización incremental ----
+
+def _marca(nombre):
+    return db.session.scalar(select(MarcaResumen.marca).where(MarcaResumen.nombre == nombre))
+
+
+def _guardar_marca(nombre, marca):
+    fila = db.session.get(MarcaResumen, nombre)
+    if fila is None:
+        db.session.add(MarcaResumen(nombre=nombre, marca=marca, fecha_actualizacion=datetime.utcnow()))
+    else:
+        fila.marca = marca
+        fila.fecha_actualizacion = datetime.utcnow()
+
+
+def _dias(desde, hasta):
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def _tramos(dias):
+    """Agrupa días en rangos [inicio, fin] consecutivos de hasta DIAS_POR_LOTE"""
+    tramo = []
+    for dia in sorted(dias):
+        if tramo and (dia != tramo[-1] + timedelta(days=1) or len(tramo) >= DIAS_POR_LOTE):
+            yield tramo[0], tramo[-1]
+            tramo = []
+        tramo.append(dia)
+    if tramo:
+        yield tramo[0], tramo[-1]
+
+
+def _limites(inicio, fin):
+    """Rango de fechas [inicio 00:00, fin + 1 día 00:00) para filtrar por índice"""
+    return datetime.combine(inicio, hora.min), datetime.combine(fin + timedelta(days=1), hora.min)
+
+
+def _recalcular_ventas(inicio, fin):
+    desde, hasta = _limites(inicio, fin)
+    db.session.execute(
+        delete(ResumenVentaProducto)
+        .where(ResumenVentaProducto.dia >= inicio, ResumenVentaProducto.dia <= fin)
+    )
+    dia = func.date(Pedido.fecha)
+    db.session.execute(
+        insert(ResumenVentaProducto).from_select(
+            ['dia', 'id_producto', 'pedidos', 'unidades', 'ingresos'],
+            select(
+                dia, DetallePedido.id_producto,
+                func.count(func.distinct(Pedido.id_pedido)),
+                func.sum(DetallePedido.cantidad),
+                func.sum(DetallePedido.cantidad * func.coalesce(DetallePedido.precio_unitario, Producto.precio)),
+            )
+            .join(DetallePedido, DetallePedido.id_pedido == Pedido.id_pedido)
+            .join(Producto, Producto.id_producto == DetallePedido.id_producto)
+            .where(Pedido.fecha >= desde, Pedido.fecha < hasta,
+                   Pedido.estado.not_in(ESTADOS_SIN_VENTA))
+            .group_by(dia, DetallePedido.id_producto)
+        )
+    )
+
+
+def _recalcular_estados(inicio, fin):
+    desde, hasta = _limites(inicio, fin)
+    db.session.execute(
+        delete(ResumenPedidosEstado)
+        .where(ResumenPedidosEstado.dia >= inicio, ResumenPedidosEstado.dia <= fin)
+    )
+    dia = func.date(Pedido.fecha)
+    db.session.execute(
+        insert(ResumenPedidosEstado).from_select(
+            ['dia', 'estado', 'pedidos', 'monto'],
+            select(dia, Pedido.estado, func.count(Pedido.id_pedido), func.sum(Pedido.total))
+            .where(Pedido.fecha >= desde, Pedido.fecha < hasta)
+            .group_by(dia, Pedido.estado)
+        )
+    )
+
+
+def _recalcular_transiciones(inicio, fin):
+    desde, hasta = _limites(inicio, fin)
+    db.session.execute(
+        delete(ResumenTransicion)
+        .where(ResumenTransicion.dia >= inicio, ResumenTransicion.dia <= fin)
+    )
+    anterior = aliased(SeguimientoPedido)
+    estado_anterior = (
+        select(anterior.estado)
+        .where(anterior.id_pedido == SeguimientoPedido.id_pedido,
+               anterior.id_seguimiento < SeguimientoPedido.id_seguimiento)
+        .order_by(anterior.id_seguimiento.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    cambios = (
+        select(func.date(SeguimientoPedido.fecha).label('dia'), SeguimientoPedido.id_empleado,
+               estado_anterior.label('estado_anterior'), SeguimientoPedido.estado)
+        .where(SeguimientoPedido.fecha >= desde, SeguimientoPedido.fecha < hasta)
+        .subquery()
+    )
+    db.session.execute(
+        insert(ResumenTransicion).from_select(
+            ['dia', 'id_empleado', 'estado_anterior', 'estado', 'cantidad'],
+            select(cambios.c.dia, cambios.c.id_empleado, cambios.c.estado_anterior,
+                   cambios.c.estado, func.count())
+            .group_by(cambios.c.dia, cambios.c.id_empleado, cambios.c.estado_anterior, cambios.c.estado)
+        )
+    )
+
+
+def consulta_fechas_cambiadas(marca_seguimiento, marca_pedidos):
+    """Fechas de los pedidos anteriores a `marca_pedidos` con seguimientos
+    desde `marca_seguimiento`.
+
+    Parte de los seguimientos nuevos (ix_seguimiento_fecha) y busca cada
+    pedido por clave: el costo depende de lo cambiado, no del historial.
+    """
+    cambiados = select(SeguimientoPedido.id_pedido).where(SeguimientoPedido.fecha >= marca_seguimiento)
+    return (
+        select(Pedido.fecha).distinct()
+        .where(Pedido.id_pedido.in_(cambiados), Pedido.fecha < marca_pedidos)
+    )
+
+
+def actualizar(desde=None):
+    """Actualiza las tablas de resumen y devuelve los días recalculados.
+
+    Sin `desde` es incremental: se recalculan los días desde la última marca
+    (la fecha más reciente ya procesada de pedidos y de seguimientos) y los
+    días de los pedidos que tuvieron seguimientos nuevos, porque cambiar el
+    estado o los detalles de un pedido siempre registra un seguimiento. Con
+    `desde` (una fecha) se reconstruye todo a partir de ese día; hace falta
+    tras importar pedidos históricos o eliminar pedidos antiguos. Cada tramo
+    de días se borra y se vuelve a insertar en su propia transacción, así
+    repetir una ejecución interrumpida es seguro.
+    """
+    ultimo_pedido = db.session.scalar(select(func.max(Pedido.fecha)))
+    ultimo_seguimiento = db.session.scalar(select(func.max(SeguimientoPedido.fecha)))
+    if ultimo_pedido is None and ultimo_seguimiento is None:
+        return {'pedidos': 0, 'transiciones': 0}
+    hoy = max(fecha for fecha in (ultimo_pedido, ultimo_seguimiento) if fecha is not None).date()
+
+    marca_pedidos = _marca('pedidos')
+    marca_seguimiento = _marca('seguimiento')
+    if desde is None and (marca_pedidos is None or marca_seguimiento is None):
+        # Primera ejecución: desde el registro más antiguo
+        primero = [fecha for fecha in (
+            db.session.scalar(select(func.min(Pedido.fecha))),
+            db.session.scalar(select(func.min(SeguimientoPedido.fecha))),
+        ) if fecha is not None]
+        desde = min(primero).date()
+
+    if desde is not None:
+        dias_pedidos = set(_dias(desde, hoy))
+        dias_transiciones = set(dias_pedidos)
+    else:
+        dias_pedidos = set(_dias(marca_pedidos.date(), hoy))
+        dias_transiciones = set(_dias(marca_seguimiento.date(), hoy))
+        # Pedidos antiguos que cambiaron de estado o de detalles
+        dias_pedidos.update(fecha.date() for fecha in db.session.scalars(
+            consulta_fechas_cambiadas(marca_seguimiento, marca_pedidos)
+        ))
+
+    for inicio, fin in _tramos(dias_pedidos):
+        _recalcular_ventas(inicio, fin)
+        _recalcular_estados(inicio, fin)
+        db.session.commit()
+    for inicio, fin in _tramos(dias_transiciones):
+        _recalcular_transiciones(inicio, fin)
+        db.session.commit()
+
+    # Las marcas se mueven solo al final: si el proceso se interrumpe, la
+    # próxima ejecución repite los mismos días
+    if ultimo_pedido is not None:
+        _guardar_marca('pedidos', ultimo_pedido)
+    if ultimo_seguimiento is not None:
+        _guardar_marca('seguimiento', ultimo_seguimiento)
+    db.session.commit()
+    return {'pedidos': len(dias_pedidos), 'transiciones': len(dias_transiciones)}
+
+
+def actualizar_continuamente(intervalo=300):
+    """Bucle del proceso de resúmenes: actualiza y espera `intervalo` segundos"""
+    while True:
+        try:
+            dias = actualizar()
+            logger.info('Resúmenes actualizados: %s', dias)
+        except Exception:
+            db.session.rollback()
+            logger.exception('Error al actualizar los resúmenes')
+        time.sleep(intervalo)
+
+
+# ---- Lectura (solo tablas de resumen) ----
+
+def _numero(valor):
+    return float(valor) if valor is not None else 0.0
+
+
+def datos_reportes(dias=90, hoy=None):
+    """Series para los gráficos de /admin/reportes de los últimos `dias` días"""
+    hoy = hoy or date.today()
+    desde = hoy - timedelta(days=dias - 1)
+
+    por_dia = db.session.execute(
+        select(ResumenVentaProducto.dia, func.sum(ResumenVentaProducto.ingresos),
+               func.sum(ResumenVentaProducto.unidades))
+        .where(ResumenVentaProducto.dia >= desde)
+        .group_by(ResumenVentaProducto.dia)
+        .order_by(ResumenVentaProducto.dia)
+    ).all()
+    # Las semanas empiezan el lunes; se agrupan aquí para no depender del motor
+    semanas = {}
+    for dia, ingresos, _ in por_dia:
+        lunes = dia - timedelta(days=dia.weekday())
+        semanas[lunes] = semanas.get(lunes, 0.0) + _numero(ingresos)
+
+    productos = db.session.execute(
+        select(Producto.nombre, func.sum(ResumenVentaProducto.unidades).label('unidades'),
+               func.sum(ResumenVentaProducto.ingresos))
+        .join(Producto, Producto.id_producto == ResumenVentaProducto.id_producto)
+        .where(ResumenVentaProducto.dia >= desde)
+        .group_by(ResumenVentaProducto.id_producto, Producto.nombre)
+        .order_by(func.sum(ResumenVentaProducto.unidades).desc())
+        .limit(15)
+    ).all()
+
+    estados = db.session.execute(
+        select(ResumenPedidosEstado.estado, func.sum(ResumenPedidosEstado.pedidos))
+        .where(ResumenPedidosEstado.dia >= desde)
+        .group_by(ResumenPedidosEstado.estado)
+        .order_by(func.sum(ResumenPedidosEstado.pedidos).desc())
+    ).all()
+
+    transiciones = db.session.execute(
+        select(Usuario.nombre, ResumenTransicion.estado, func.sum(ResumenTransicion.cantidad))
+        .outerjoin(Empleado, Empleado.id_empleado == ResumenTransicion.id_empleado)
+        .outerjoin(Usuario, Usuario.id_usuario == Empleado.id_usuario)
+        .where(ResumenTransicion.dia >= desde, ResumenTransicion.id_empleado.is_not(None))
+        .group_by(ResumenTransicion.id_empleado, Usuario.nombre, ResumenTransicion.estado)
+        .order_by(Usuario.nombre, ResumenTransicion.estado)
+    ).all()
+
+    marcas = dict(db.session.execute(
+        select(MarcaResumen.nombre, MarcaResumen.fecha_actualizacion)
+    ).all())
+
+    return {
+        'desde': desde.isoformat(),
+        'actualizado': marcas['pedidos'].strftime('%d/%m/%Y %H:%M') if 'pedidos' in marcas else None,
+        'ingresos_diarios': [
+            {'dia': dia.isoformat(), 'ingresos': _numero(ingresos), 'unidades': int(unidades or 0)}
+            for dia, ingresos, unidades in por_dia
+        ],
+        'ingresos_semanales': [
+            {'semana': lunes.isoformat(), 'ingresos': round(ingresos, 2)}
+            for lunes, ingresos in sorted(semanas.items())
+        ],
+        'productos': [
+            {'nombre': nombre, 'unidades': int(unidades or 0), 'ingresos': _numero(ingresos)}
+            for nombre, unidades, ingresos in productos
+        ],
+        'pedidos_por_estado': [
+            {'estado': estado, 'pedidos': int(pedidos or 0)} for estado, pedidos in estados
+        ],
+        'transiciones': [
+            {'empleado': empleado or 'Sin nombre', 'estado': estado, 'cantidad': int(cantidad or 0)}
+            for empleado, estado, cantidad in transiciones
+        ],
+    }
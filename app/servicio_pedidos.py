@@ -0,0 +1,344 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, insert, update, delete, case, func, or_
+
+from models import db, Producto, Insumo, InsumoProducto, Pedido, DetallePedido, SeguimientoPedido
+
+ESTADOS_PEDIDO = ['pendiente', 'en_proceso', 'en_produccion', 'listo', 'enviado', 'entregado', 'cancelado']
+# Estados de un pedido que ya pasó por producción (sus insumos están consumidos)
+ESTADOS_PRODUCIDOS = ('en_produccion', 'listo', 'enviado', 'entregado')
+# Estados cuyos insumos todavía hay que cubrir
+ESTADOS_POR_PRODUCIR = ('pendiente', 'en_proceso')
+
+
+class PedidoError(Exception):
+    """Error de validación al registrar o modificar un pedido"""
+
+
+def leer_lineas(productos_ids, cantidades):
+    """Convierte las listas del formulario en {id_producto: cantidad}.
+
+    Las filas vacías se ignoran; las que tienen datos inválidos se cuentan
+    como omitidas. Un mismo producto repetido acumula sus cantidades.
+    Devuelve (lineas, omitidas).
+    """
+    lineas = {}
+    omitidas = 0
+    for i, prod_id in enumerate(productos_ids):
+        if not prod_id or i >= len(cantidades) or not cantidades[i]:
+            continue
+        try:
+            id_producto = int(prod_id)
+            cantidad = int(cantidades[i])
+        except (ValueError, TypeError):
+            omitidas += 1
+            continue
+        if cantidad <= 0:
+            omitidas += 1
+            continue
+        lineas[id_producto] = lineas.get(id_producto, 0) + cantidad
+    return lineas, omitidas
+
+
+def _precios(lineas):
+    """Precio actual de cada producto en una sola consulta IN.
+
+    Lanza PedidoError si alguno no existe.
+    """
+    precios = dict(db.session.execute(
+        select(Producto.id_producto, Producto.precio).where(Producto.id_producto.in_(lineas))
+    ).all())
+    faltantes = sorted(set(lineas) - set(precios))
+    if faltantes:
+        raise PedidoError('Productos no encontrados: ' + ', '.join(f'#{i}' for i in faltantes))
+    return precios
+
+
+def _insertar_detalles(id_pedido, lineas, precios):
+    db.session.execute(insert(DetallePedido), [
+        {'id_pedido': id_pedido, 'id_producto': id_producto, 'cantidad': cantidad,
+         'precio_unitario': precios[id_producto]}
+        for id_producto, cantidad in lineas.items()
+    ])
+
+
+def _asignar_totales(pedido, lineas, precios):
+    pedido.total = sum((precios[id_producto] * cantidad for id_producto, cantidad in lineas.items()), Decimal(0))
+    pedido.num_items = len(lineas)
+
+
+def descontar_stock(lineas):
+    """Descuenta el stock de todos los productos con un único UPDATE.
+
+    Antes se leen las existencias (con FOR UPDATE, que en MySQL bloquea las
+    filas hasta el commit): si algún producto no alcanza se lanza PedidoError
+    con solo esos productos y no se actualiza ninguna fila.
+    """
+    existencias = db.session.execute(
+        select(Producto.id_producto, Producto.nombre, Producto.stock)
+        .where(Producto.id_producto.in_(lineas))
+        .order_by(Producto.id_producto)
+        .with_for_update()
+    ).all()
+    sin_stock = sorted(nombre for id_producto, nombre, stock in existencias if stock < lineas[id_producto])
+    if sin_stock:
+        raise PedidoError('Stock insuficiente para: ' + ', '.join(sin_stock))
+
+    cantidad = case(lineas, value=Producto.id_producto)
+    resultado = db.session.execute(
+        update(Producto)
+        .where(Producto.id_producto.in_(lineas), Producto.stock >= cantidad)
+        .values(stock=Producto.stock - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != len(lineas):
+        # Solo sin bloqueo de filas (SQLite): otra transacción cambió el stock
+        # entre la lectura y el UPDATE; el llamador hace rollback
+        raise PedidoError('El stock cambió mientras se registraba el pedido, intente de nuevo.')
+
+
+def devolver_stock(lineas):
+    """Repone el stock de las líneas indicadas en un único UPDATE"""
+    if not lineas:
+        return
+    cantidad = case(lineas, value=Producto.id_producto)
+    db.session.execute(
+        update(Producto)
+        .where(Producto.id_producto.in_(lineas))
+        .values(stock=Producto.stock + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def lineas_de_pedido(id_pedido):
+    filas = db.session.execute(
+        select(DetallePedido.id_producto, DetallePedido.cantidad)
+        .where(DetallePedido.id_pedido == id_pedido)
+    ).all()
+    lineas = {}
+    for id_producto, cantidad in filas:
+        lineas[id_producto] = lineas.get(id_producto, 0) + cantidad
+    return lineas
+
+
+def registrar_pedido(id_cliente, lineas, estado='pendiente', id_empleado=None,
+                     comentario='Pedido recibido'):
+    """Crea el pedido, sus detalles y el seguimiento inicial, y descuenta stock.
+
+    El número de consultas no depende de la cantidad de líneas. No hace
+    commit: si se lanza PedidoError el llamador debe hacer rollback.
+    """
+    precios = _precios(lineas) if lineas else {}
+
+    ahora = datetime.utcnow()
+    pedido = Pedido(id_cliente=id_cliente, fecha=ahora, estado=estado)
+    _asignar_totales(pedido, lineas, precios)
+    db.session.add(pedido)
+    db.session.flush()
+
+    if lineas:
+        _insertar_detalles(pedido.id_pedido, lineas, precios)
+        descontar_stock(lineas)
+
+    db.session.add(SeguimientoPedido(
+        id_pedido=pedido.id_pedido,
+        fecha=ahora,
+        estado=estado,
+        id_empleado=id_empleado,
+        comentario=comentario
+    ))
+    return pedido
+
+
+def _detalles_actuales(id_pedido):
+    """Cantidad y precio_unitario por producto de los detalles del pedido"""
+    cantidades, precios = {}, {}
+    for id_producto, cantidad, precio_unitario in db.session.execute(
+        select(DetallePedido.id_producto, DetallePedido.cantidad, DetallePedido.precio_unitario)
+        .where(DetallePedido.id_pedido == id_pedido)
+    ):
+        cantidades[id_producto] = cantidades.get(id_producto, 0) + cantidad
+        if precio_unitario is not None:
+            precios[id_producto] = precio_unitario
+    return cantidades, precios
+
+
+def reemplazar_detalles(pedido, lineas):
+    """Sustituye los detalles del pedido ajustando el stock de forma atómica.
+
+    Los productos que ya estaban en el pedido conservan su precio_unitario
+    (y el total no se recalcula a precios de hoy); solo los productos nuevos
+    toman el precio actual. Si los insumos del pedido ya se consumieron, se
+    descuenta o repone la diferencia. Devuelve los insumos que la edición
+    dejó por debajo de su stock mínimo.
+    """
+    anteriores, precios = _detalles_actuales(pedido.id_pedido)
+    nuevos = {id_producto: cantidad for id_producto, cantidad in lineas.items() if id_producto not in precios}
+    if nuevos:
+        precios.update(_precios(nuevos))
+    devolver_stock(anteriores)
+    db.session.execute(delete(DetallePedido).where(DetallePedido.id_pedido == pedido.id_pedido))
+    if lineas:
+        _insertar_detalles(pedido.id_pedido, lineas, precios)
+        descontar_stock(lineas)
+    _asignar_totales(pedido, lineas, precios)
+    if not pedido.insumos_consumidos:
+        return []
+    diferencia = {id_producto: lineas.get(id_producto, 0) - anteriores.get(id_producto, 0)
+                  for id_producto in set(lineas) | set(anteriores)}
+    return _ajustar_insumos({id_producto: cantidad for id_producto, cantidad in diferencia.items() if cantidad})
+
+
+# ---- Insumos ----
+
+def _consumo_por_insumo(id_pedido):
+    return dict(db.session.execute(
+        select(InsumoProducto.id_insumo, func.sum(InsumoProducto.cantidad * DetallePedido.cantidad))
+        .join(DetallePedido, DetallePedido.id_producto == InsumoProducto.id_producto)
+        .where(DetallePedido.id_pedido == id_pedido)
+        .group_by(InsumoProducto.id_insumo)
+    ).all())
+
+
+def consumir_insumos(pedido, estado_anterior):
+    """Descuenta los insumos del pedido cuando pasa a producción.
+
+    Todos los insumos se descuentan con un único UPDATE. No se bloquea el
+    cambio de estado por falta de insumos: el inventario se lleva a mano y
+    un saldo negativo muestra lo que falta reponer. Devuelve los insumos que
+    este consumo dejó por debajo de su stock mínimo, para avisar una sola
+    vez al cruzar el umbral en lugar de revisar todo el inventario.
+    """
+    if pedido.estado not in ESTADOS_PRODUCIDOS or estado_anterior in ESTADOS_PRODUCIDOS:
+        return []
+    # Marca condicional: un pedido que vuelve atrás y avanza de nuevo, o que
+    # dos empleados actualizan a la vez, consume una sola vez
+    marcado = db.session.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido == pedido.id_pedido, Pedido.insumos_consumidos.is_(False))
+        .values(insumos_consumidos=True)
+        .execution_options(synchronize_session=False)
+    )
+    if marcado.rowcount != 1:
+        return []
+
+    return _descontar_insumos(_consumo_por_insumo(pedido.id_pedido))
+
+
+def _ajustar_insumos(cantidades):
+    """Descuenta (o repone, si la cantidad es negativa) los insumos de
+    {id_producto: cantidad} según la lista de insumos de cada producto"""
+    if not cantidades:
+        return []
+    consumo = {}
+    for id_producto, id_insumo, cantidad in db.session.execute(
+        select(InsumoProducto.id_producto, InsumoProducto.id_insumo, InsumoProducto.cantidad)
+        .where(InsumoProducto.id_producto.in_(cantidades))
+    ):
+        consumo[id_insumo] = consumo.get(id_insumo, 0) + cantidad * cantidades[id_producto]
+    return _descontar_insumos({id_insumo: total for id_insumo, total in consumo.items() if total})
+
+
+def _descontar_insumos(consumo):
+    """Un único UPDATE; devuelve los insumos que cruzaron su stock mínimo"""
+    if not consumo:
+        return []
+    cantidad = case(consumo, value=Insumo.id_insumo)
+    db.session.execute(
+        update(Insumo)
+        .where(Insumo.id_insumo.in_(consumo))
+        .values(cantidad=Insumo.cantidad - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    bajos = db.session.execute(
+        select(Insumo.id_insumo, Insumo.nombre, Insumo.cantidad, Insumo.unidad, Insumo.stock_minimo)
+        .where(Insumo.id_insumo.in_(consumo), Insumo.stock_minimo > 0, Insumo.cantidad < Insumo.stock_minimo)
+    ).all()
+    return [fila for fila in bajos if fila.cantidad + consumo[fila.id_insumo] >= fila.stock_minimo]
+
+
+def proyeccion_insumos():
+    """Insumos necesarios para los pedidos aún no producidos, en una consulta.
+
+    Filas (id_insumo, nombre, unidad, cantidad, stock_minimo, necesario) de
+    todos los insumos, ordenadas por faltante.
+    """
+    necesario = (
+        select(InsumoProducto.id_insumo,
+               func.sum(InsumoProducto.cantidad * DetallePedido.cantidad).label('necesario'))
+        .join(DetallePedido, DetallePedido.id_producto == InsumoProducto.id_producto)
+        .join(Pedido, Pedido.id_pedido == DetallePedido.id_pedido)
+        .where(Pedido.estado.in_(ESTADOS_POR_PRODUCIR), Pedido.insumos_consumidos.is_(False))
+        .group_by(InsumoProducto.id_insumo)
+        .subquery()
+    )
+    total = func.coalesce(necesario.c.necesario, 0)
+    return db.session.execute(
+        select(Insumo.id_insumo, Insumo.nombre, Insumo.unidad, Insumo.cantidad, Insumo.stock_minimo,
+               total.label('necesario'))
+        .outerjoin(necesario, necesario.c.id_insumo == Insumo.id_insumo)
+        .order_by((total - Insumo.cantidad).desc(), Insumo.nombre)
+    ).all()
+
+
+# ---- Totales desnormalizados ----
+
+def _total_calculado():
+    return func.coalesce(
+        select(func.round(func.sum(DetallePedido.cantidad * DetallePedido.precio_unitario), 2))
+        .where(DetallePedido.id_pedido == Pedido.id_pedido)
+        .scalar_subquery(),
+        0
+    )
+
+
+def _items_calculados():
+    return (
+        select(func.count(DetallePedido.id_detalle))
+        .where(DetallePedido.id_pedido == Pedido.id_pedido)
+        .scalar_subquery()
+    )
+
+
+def completar_precios_unitarios(desde_id, hasta_id):
+    """Detalles sin precio_unitario en [desde_id, hasta_id] toman el precio actual"""
+    resultado = db.session.execute(
+        update(DetallePedido)
+        .where(DetallePedido.id_detalle.between(desde_id, hasta_id),
+               DetallePedido.precio_unitario.is_(None))
+        .values(precio_unitario=select(Producto.precio)
+                .where(Producto.id_producto == DetallePedido.id_producto)
+                .scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+
+def recalcular_totales(desde_id, hasta_id):
+    """Recalcula total y num_items de los pedidos en [desde_id, hasta_id]"""
+    resultado = db.session.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido.between(desde_id, hasta_id))
+        .values(total=_total_calculado(), num_items=_items_calculados())
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+
+def totales_inconsistentes(desde_id, hasta_id):
+    """Pedidos en [desde_id, hasta_id] cuyo total o num_items no coincide con
+    sus detalles: (id_pedido, total, total_calculado, num_items, items_calculados)"""
+    total, items = _total_calculado(), _items_calculados()
+    return db.session.execute(
+        select(Pedido.id_pedido, Pedido.total, total, Pedido.num_items, items)
+        .where(Pedido.id_pedido.between(desde_id, hasta_id),
+               or_(Pedido.total != total, Pedido.num_items != items))
+        .order_by(Pedido.id_pedido)
+    ).all()
+
+
+def detalles_sin_precio():
+    return db.session.scalar(
+        select(func.count(DetallePedido.id_detalle)).where(DetallePedido.precio_unitario.is_(None))
+    )
@@ -0,0 +1,70 @@
+// Sugerencias mientras se escribe en el buscador del encabezado (/buscar/sugerencias)
+(function() {
+    const entrada = document.querySelector('.buscador input[data-sugerencias]');
+    if (!entrada) {
+        return;
+    }
+    const lista = entrada.parentElement.querySelector('.buscador-sugerencias');
+    const MINIMO = 3;
+    const ESPERA_MS = 150;
+    let temporizador = null;
+    let pendiente = null;
+
+    function ocultar() {
+        lista.hidden = true;
+        lista.replaceChildren();
+    }
+
+    function mostrar(sugerencias) {
+        lista.replaceChildren(...sugerencias.map(s => {
+            const item = document.createElement('li');
+            item.className = 'list-group-item p-0';
+            const enlace = document.createElement('a');
+            enlace.href = s.url;
+            enlace.textContent = s.texto;
+            const tipo = document.createElement('small');
+            tipo.className = 'text-muted float-end';
+            tipo.textContent = s.tipo;
+            enlace.append(tipo);
+            item.append(enlace);
+            return item;
+        }));
+        lista.hidden = sugerencias.length === 0;
+    }
+
+    function consultar() {
+        const texto = entrada.value.trim();
+        if (texto.length < MINIMO && !/^#?\d+$/.test(texto)) {
+            ocultar();
+            return;
+        }
+        // Una respuesta vieja no debe pisar a la más reciente
+        if (pendiente) {
+            pendiente.abort();
+        }
+        pendiente = new AbortController();
+        fetch(entrada.dataset.sugerencias + '?q=' + encodeURIComponent(texto), { signal: pendiente.signal })
+            .then(r => r.ok ? r.json() : { sugerencias: [] })
+            .then(datos => mostrar(datos.sugerencias))
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    ocultar();
+                }
+            });
+    }
+
+    entrada.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(consultar, ESPERA_MS);
+    });
+    entrada.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') {
+            ocultar();
+        }
+    });
+    document.addEventListener('click', function(e) {
+        if (!entrada.parentElement.contains(e.target)) {
+            ocultar();
+        }
+    });
+})();
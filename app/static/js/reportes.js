@@ -0,0 +1,40 @@
+// Dibuja los gráficos de /admin/reportes con los datos que trae la página
+(function() {
+    const fuente = document.getElementById('datos-reportes');
+    if (!fuente || !window.Chart) {
+        return;
+    }
+    const datos = JSON.parse(fuente.textContent);
+    const moneda = valor => '$' + Number(valor).toLocaleString('es', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+
+    function grafico(id, tipo, etiquetas, conjuntos, opciones) {
+        const lienzo = document.getElementById(id);
+        if (lienzo) {
+            new Chart(lienzo, { type: tipo, data: { labels: etiquetas, datasets: conjuntos }, options: opciones || {} });
+        }
+    }
+
+    const ejeMoneda = {
+        plugins: { legend: { display: false } },
+        scales: { y: { beginAtZero: true, ticks: { callback: moneda } } }
+    };
+
+    grafico('grafico-ingresos-diarios', 'line',
+        datos.ingresos_diarios.map(f => f.dia),
+        [{ label: 'Ingresos', data: datos.ingresos_diarios.map(f => f.ingresos), tension: 0.2, fill: true }],
+        ejeMoneda);
+
+    grafico('grafico-ingresos-semanales', 'bar',
+        datos.ingresos_semanales.map(f => 'Semana del ' + f.semana),
+        [{ label: 'Ingresos', data: datos.ingresos_semanales.map(f => f.ingresos) }],
+        ejeMoneda);
+
+    grafico('grafico-productos', 'bar',
+        datos.productos.map(f => f.nombre),
+        [{ label: 'Unidades', data: datos.productos.map(f => f.unidades) }],
+        { indexAxis: 'y', plugins: { legend: { display: false } } });
+
+    grafico('grafico-estados', 'doughnut',
+        datos.pedidos_por_estado.map(f => f.estado.replace('_', ' ')),
+        [{ label: 'Pedidos', data: datos.pedidos_por_estado.map(f => f.pedidos) }]);
+})();
@@ -0,0 +1,100 @@
+// Actualiza el tablero de pedidos con los eventos SSE de /empleado/pedidos/eventos
+(function() {
+    const tablero = document.getElementById('tablero-pedidos');
+    if (!tablero || !window.EventSource) {
+        return;
+    }
+
+    const COLORES = { entregado: 'success', pendiente: 'warning' };
+
+    function pintarEstado(badge, estado) {
+        badge.textContent = estado;
+        badge.className = 'badge bg-' + (COLORES[estado] || 'info');
+    }
+
+    function formatearFecha(iso) {
+        const f = new Date(iso + 'Z');
+        const dos = n => String(n).padStart(2, '0');
+        return dos(f.getDate()) + '/' + dos(f.getMonth() + 1) + '/' + f.getFullYear() +
+            ' ' + dos(f.getHours()) + ':' + dos(f.getMinutes());
+    }
+
+    function insertarFila(evento) {
+        const plantilla = document.getElementById('fila-pedido');
+        const cuerpo = tablero.querySelector('tbody');
+        if (!plantilla || !cuerpo || tablero.dataset.insertar !== 'true') {
+            return;
+        }
+        if (cuerpo.querySelector('[data-pedido="' + evento.id_pedido + '"]')) {
+            return;
+        }
+        const fila = plantilla.content.firstElementChild.cloneNode(true);
+        fila.dataset.pedido = evento.id_pedido;
+        fila.querySelector('[data-campo="id_pedido"]').textContent = evento.id_pedido;
+        fila.querySelector('[data-campo="cliente"]').textContent = evento.cliente || 'N/A';
+        fila.querySelector('[data-campo="fecha_pedido"]').textContent = formatearFecha(evento.fecha_pedido);
+        fila.querySelector('[data-campo="items"]').textContent = evento.items + ' items';
+        fila.querySelector('[data-campo="total"]').textContent = '$' + evento.total;
+        pintarEstado(fila.querySelector('[data-estado]'), evento.estado);
+        fila.querySelectorAll('[data-href]').forEach(enlace => {
+            enlace.href = enlace.dataset.href.replace('/0/', '/' + evento.id_pedido + '/');
+        });
+        const vacio = cuerpo.querySelector('[data-vacio]');
+        if (vacio) {
+            vacio.remove();
+        }
+        cuerpo.prepend(fila);
+        fila.classList.add('table-warning');
+    }
+
+    // EventSource no reintenta tras una respuesta de error, como el 503 de un
+    // worker con el máximo de tableros conectados: se reconecta a mano, desde
+    // el último evento recibido
+    const ESPERA_SATURADO_MS = 30000;
+    const url = new URL(tablero.dataset.eventos, window.location.href);
+
+    function anotar(e) {
+        if (e.lastEventId) {
+            url.searchParams.set('ultimo', e.lastEventId);
+        }
+    }
+
+    function conectar() {
+        const fuente = new EventSource(url);
+
+        fuente.addEventListener('pedido_creado', function(e) {
+            anotar(e);
+            const evento = JSON.parse(e.data);
+            insertarFila(evento);
+            const contador = tablero.querySelector('[data-nuevos]');
+            if (contador) {
+                contador.textContent = Number(contador.textContent) + 1;
+                tablero.hidden = false;
+            }
+        });
+
+        fuente.addEventListener('estado_cambiado', function(e) {
+            anotar(e);
+            const evento = JSON.parse(e.data);
+            const fila = tablero.querySelector('[data-pedido="' + evento.id_pedido + '"]');
+            if (fila) {
+                pintarEstado(fila.querySelector('[data-estado]'), evento.estado);
+                fila.classList.add('table-info');
+            }
+        });
+
+        // Se perdieron demasiados eventos para reanudar: recargar la página
+        fuente.addEventListener('recargar', function() {
+            fuente.close();
+            window.location.reload();
+        });
+
+        fuente.addEventListener('error', function() {
+            if (fuente.readyState === EventSource.CLOSED) {
+                setTimeout(conectar, ESPERA_SATURADO_MS);
+            }
+        });
+    }
+
+    conectar();
+})();
@@ -0,0 +1,72 @@
+"""Mide el tiempo de arranque de un worker (importar app.py).
+
+Cada medición se hace en un proceso nuevo y cuenta también las conexiones y
+sentencias SQL emitidas durante la importación. Con --con-init se ejecuta
+además init_database(), que es lo que hacía antes cada worker al importar,
+para comparar ambos modos.
+
+Uso:
+    DATABASE_URL=sqlite:////tmp/luma.db python benchmarks/arranque.py -n 10
+    python benchmarks/arranque.py -n 10 --con-init
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRECTORIO_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+CODIGO_MEDICION = r'''
+import json, sys, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+contadores = {'conexiones': 0, 'sentencias': 0}
+event.listen(Pool, 'connect', lambda *a: contadores.__setitem__('conexiones', contadores['conexiones'] + 1))
+event.listen(Engine, 'before_cursor_execute', lambda *a: contadores.__setitem__('sentencias', contadores['sentencias'] + 1))
+
+inicio = time.perf_counter()
+import app
+if sys.argv[1] == '1':
+    with app.app.app_context():
+        app.init_database()
+contadores['segundos'] = time.perf_counter() - inicio
+print(json.dumps(contadores))
+'''
+
+
+def medir(repeticiones, con_init):
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', CODIGO_MEDICION, '1' if con_init else '0'],
+            cwd=DIRECTORIO_APP, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        resultados.append(json.loads(salida))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--repeticiones', type=int, default=5)
+    parser.add_argument('--con-init', action='store_true',
+                        help='ejecutar init_database() al importar (comportamiento anterior)')
+    args = parser.parse_args()
+
+    resultados = medir(args.repeticiones, args.con_init)
+    tiempos = [r['segundos'] * 1000 for r in resultados]
+    print(json.dumps({
+        'modo': 'con init_database()' if args.con_init else 'sin E/S de base de datos',
+        'repeticiones': args.repeticiones,
+        'arranque_ms_mediana': round(statistics.median(tiempos), 1),
+        'arranque_ms_max': round(max(tiempos), 1),
+        'conexiones': resultados[-1]['conexiones'],
+        'sentencias_sql': resultados[-1]['sentencias'],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
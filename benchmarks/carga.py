@@ -0,0 +1,403 @@
+"""Prueba de carga HTTP con recorridos de usuario por rol.
+
+Cada usuario virtual es un hilo con su propia conexión keep-alive y su
+cookie de sesión. Repite recorridos (anónimo, cliente, empleado y
+administrador, según --mezcla) hasta cumplir --duracion segundos, y al
+final se informa por petición y en total: cantidad, errores, peticiones por
+segundo y latencias p50/p95/p99. Las redirecciones no se siguen: cada
+petición se mide por separado.
+
+Las cuentas y los rangos de ids son los de benchmarks/datos.py, que debe
+haberse ejecutado antes sobre la misma base. Con --gunicorn se levanta un
+gunicorn local (gunicorn.conf.py) sobre --database-url y se detiene al
+terminar; sin él se usa el servidor de --url.
+
+Uso:
+    python benchmarks/datos.py --database-url sqlite:////tmp/luma_carga.db
+    python benchmarks/carga.py --gunicorn --database-url sqlite:////tmp/luma_carga.db \\
+        --usuarios 32 --duracion 60 --salida carga.json
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --comparar carga.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from datos import CONTRASENA, DOMINIO, APELLIDOS, PRODUCTOS, VARIANTES
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DIRECTORIO_APP = os.path.join(RAIZ, 'app')
+
+sys.path.insert(0, DIRECTORIO_APP)
+from metricas_pool import percentil  # noqa: E402
+
+# Estados que un empleado asigna en su recorrido
+ESTADOS_EMPLEADO = ['en_proceso', 'en_produccion', 'listo', 'enviado', 'entregado']
+# Fracción de pedidos más recientes sobre la que trabajan los empleados
+FRACCION_RECIENTES = 0.01
+
+
+class Registro:
+    """Latencias y errores por nombre de petición, compartidos entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+        self.activo = False
+
+    def anotar(self, nombre, segundos, error=None):
+        if not self.activo:
+            return
+        with self._lock:
+            self.latencias.setdefault(nombre, []).append(segundos)
+            if error is not None:
+                errores = self.errores.setdefault(nombre, {})
+                errores[error] = errores.get(error, 0) + 1
+
+
+class Navegador:
+    """Un usuario virtual: una conexión HTTP y sus cookies"""
+
+    def __init__(self, url, registro, timeout=30):
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.registro = registro
+        self.timeout = timeout
+        self.cookies = {}
+        self.conexion = None
+
+    def pedir(self, nombre, ruta, datos=None, esperados=(200,)):
+        """Hace la petición (POST si hay `datos`) y devuelve el código de estado,
+        o None si falló la conexión. Un código fuera de `esperados` es un error."""
+        cabeceras = {}
+        cuerpo = None
+        if self.cookies:
+            cabeceras['Cookie'] = '; '.join(f'{clave}={valor}' for clave, valor in self.cookies.items())
+        if datos is not None:
+            cuerpo = urlencode(datos, doseq=True)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        inicio = time.perf_counter()
+        try:
+            if self.conexion is None:
+                self.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+            self.conexion.request('POST' if datos is not None else 'GET', ruta, body=cuerpo, headers=cabeceras)
+            respuesta = self.conexion.getresponse()
+            respuesta.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.registro.anotar(nombre, time.perf_counter() - inicio, type(e).__name__)
+            self.cerrar()
+            return None
+        segundos = time.perf_counter() - inicio
+
+        for cookie in respuesta.headers.get_all('Set-Cookie') or []:
+            clave, _, resto = cookie.partition('=')
+            valor = resto.split(';', 1)[0]
+            if valor and 'max-age=0' not in cookie.lower():
+                self.cookies[clave] = valor
+            else:
+                self.cookies.pop(clave, None)
+        if respuesta.will_close:
+            self.cerrar()
+        self.registro.anotar(nombre, segundos,
+                             None if respuesta.status in esperados else str(respuesta.status))
+        return respuesta.status
+
+    def cerrar(self):
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+
+# ---- Recorridos ----
+
+class Recorridos:
+    """Secuencias de peticiones por rol sobre los datos de benchmarks/datos.py"""
+
+    def __init__(self, args, azar):
+        self.args = args
+        self.azar = azar
+
+    def pausa(self):
+        if self.args.pausa:
+            time.sleep(self.azar.uniform(0, 2 * self.args.pausa))
+
+    def id_pedido(self):
+        return self.azar.randint(1, self.args.pedidos)
+
+    def id_pedido_reciente(self):
+        recientes = max(int(self.args.pedidos * FRACCION_RECIENTES), 1)
+        return self.args.pedidos - self.azar.randrange(recientes)
+
+    def iniciar_sesion(self, navegador, correo):
+        navegador.pedir('GET /login', '/login')
+        self.pausa()
+        # Un 200 es el formulario de nuevo: credenciales rechazadas
+        return navegador.pedir('POST /login', '/login',
+                               {'correo': correo, 'password': self.args.contrasena},
+                               esperados=(302,)) == 302
+
+    def cerrar_sesion(self, navegador):
+        navegador.pedir('GET /logout', '/logout', esperados=(302,))
+        navegador.cookies.clear()
+
+    def anonimo(self, navegador):
+        id_pedido = self.id_pedido()
+        for nombre, ruta in (
+            ('GET /inicio', '/inicio'),
+            ('GET /servicios', '/servicios'),
+            ('GET /pedidos', '/pedidos'),
+            ('GET /rastrear_pedido', f'/rastrear_pedido?id={id_pedido}'),
+            ('GET /api/pedidos/<id>/estado', f'/api/pedidos/{id_pedido}/estado'),
+        ):
+            navegador.pedir(nombre, ruta)
+            self.pausa()
+
+    def cliente(self, navegador):
+        correo = f'cliente{self.azar.randint(1, self.args.clientes)}@{DOMINIO}'
+        if not self.iniciar_sesion(navegador, correo):
+            return
+        self.pausa()
+        navegador.pedir('GET /mis_pedidos', '/mis_pedidos')
+        self.pausa()
+        navegador.pedir('GET /rastrear_pedido', f'/rastrear_pedido?id={self.id_pedido()}')
+        self.pausa()
+        if self.azar.random() < self.args.compras:
+            navegador.pedir('GET /realizar_pedido', '/realizar_pedido')
+            self.pausa()
+            productos = self.azar.sample(range(1, len(PRODUCTOS) * len(VARIANTES) + 1), self.azar.randint(1, 3))
+            navegador.pedir('POST /realizar_pedido', '/realizar_pedido', {
+                'productos': productos,
+                'cantidades': [self.azar.randint(1, 5) for _ in productos],
+                'telefono': '',
+            }, esperados=(302,))
+            self.pausa()
+            navegador.pedir('GET /mis_pedidos', '/mis_pedidos')
+            self.pausa()
+        self.cerrar_sesion(navegador)
+
+    def empleado(self, navegador):
+        correo = f'empleado{self.azar.randint(1, self.args.empleados)}@{DOMINIO}'
+        if not self.iniciar_sesion(navegador, correo):
+            return
+        self.pausa()
+        navegador.pedir('GET /empleado_panel', '/empleado_panel')
+        self.pausa()
+        navegador.pedir('GET /empleado/pedidos', '/empleado/pedidos')
+        self.pausa()
+        navegador.pedir('GET /buscar', '/buscar?' + urlencode({'q': self.azar.choice(APELLIDOS)}))
+        self.pausa()
+        id_pedido = self.id_pedido_reciente()
+        ruta = f'/empleado/pedidos/{id_pedido}/actualizar'
+        navegador.pedir('GET /empleado/pedidos/<id>/actualizar', ruta)
+        self.pausa()
+        navegador.pedir('POST /empleado/pedidos/<id>/actualizar', ruta, {
+            'estado': self.azar.choice(ESTADOS_EMPLEADO),
+            'comentario': 'Prueba de carga',
+        }, esperados=(302,))
+        self.pausa()
+        self.cerrar_sesion(navegador)
+
+    def admin(self, navegador):
+        correo = f'admin{self.azar.randint(1, self.args.administradores)}@{DOMINIO}'
+        if not self.iniciar_sesion(navegador, correo):
+            return
+        self.pausa()
+        for nombre, ruta in (
+            ('GET /admin_panel', '/admin_panel'),
+            ('GET /admin/pedidos', '/admin/pedidos'),
+            ('GET /admin/pedidos?orden=total', '/admin/pedidos?orden=total'),
+            ('GET /admin/reportes', '/admin/reportes'),
+        ):
+            navegador.pedir(nombre, ruta)
+            self.pausa()
+        self.cerrar_sesion(navegador)
+
+
+def leer_mezcla(texto):
+    """'anonimo=5,cliente=3' -> {'anonimo': 5.0, 'cliente': 3.0}"""
+    mezcla = {}
+    for parte in texto.split(','):
+        rol, _, peso = parte.partition('=')
+        if rol.strip() not in ('anonimo', 'cliente', 'empleado', 'admin'):
+            raise argparse.ArgumentTypeError(f'Rol desconocido: {rol}')
+        mezcla[rol.strip()] = float(peso or 1)
+    return mezcla
+
+
+def usuario_virtual(numero, args, registro, limite):
+    azar = random.Random(args.semilla * 1000 + numero)
+    recorridos = Recorridos(args, azar)
+    navegador = Navegador(args.url, registro)
+    roles, pesos = zip(*args.mezcla.items())
+    try:
+        while time.monotonic() < limite:
+            getattr(recorridos, azar.choices(roles, pesos)[0])(navegador)
+    finally:
+        navegador.cerrar()
+
+
+# ---- Informe ----
+
+def resumir(latencias, errores, segundos):
+    cantidad = len(latencias)
+    return {
+        'peticiones': cantidad,
+        'errores': sum(errores.values()),
+        'rps': round(cantidad / segundos, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 1),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 1),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 1),
+        'max_ms': round(max(latencias, default=0) * 1000, 1),
+    }
+
+
+def informe(args, registro, segundos):
+    todas = [latencia for latencias in registro.latencias.values() for latencia in latencias]
+    errores = {}
+    for por_codigo in registro.errores.values():
+        for codigo, cantidad in por_codigo.items():
+            errores[codigo] = errores.get(codigo, 0) + cantidad
+    return {
+        'url': args.url,
+        'usuarios': args.usuarios,
+        'duracion_s': round(segundos, 1),
+        'mezcla': args.mezcla,
+        'pausa_s': args.pausa,
+        'total': {**resumir(todas, errores, segundos), 'por_codigo': errores},
+        'peticiones': {
+            nombre: {**resumir(latencias, registro.errores.get(nombre, {}), segundos),
+                     'por_codigo': registro.errores.get(nombre, {})}
+            for nombre, latencias in sorted(registro.latencias.items())
+        },
+    }
+
+
+def imprimir(resultado, anterior=None):
+    """Tabla legible en stderr; con `anterior`, la variación de rps y p95"""
+    filas = [('total', resultado['total'])] + list(resultado['peticiones'].items())
+    previas = {'total': anterior['total'], **anterior['peticiones']} if anterior else {}
+    ancho = max(len(nombre) for nombre, _ in filas)
+    encabezado = f"{'petición':<{ancho}} {'n':>7} {'err':>5} {'rps':>7} {'p50':>7} {'p95':>7} {'p99':>7}"
+    if anterior:
+        encabezado += f" {'Δrps':>7} {'Δp95':>7}"
+    print(encabezado, file=sys.stderr)
+    for nombre, datos in filas:
+        linea = (f"{nombre:<{ancho}} {datos['peticiones']:>7} {datos['errores']:>5} {datos['rps']:>7} "
+                 f"{datos['p50_ms']:>7} {datos['p95_ms']:>7} {datos['p99_ms']:>7}")
+        previa = previas.get(nombre)
+        if previa:
+            linea += f" {_variacion(datos['rps'], previa['rps']):>7} {_variacion(datos['p95_ms'], previa['p95_ms']):>7}"
+        print(linea, file=sys.stderr)
+
+
+def _variacion(actual, anterior):
+    if not anterior:
+        return '-'
+    return f'{(actual - anterior) / anterior * 100:+.0f}%'
+
+
+# ---- Servidor ----
+
+def iniciar_servidor(comando, url, database_url=None, entorno=None):
+    """Lanza `comando` desde app/ y espera a que responda en `url`"""
+    partes = urlsplit(url)
+    entorno = {**os.environ, **(entorno or {})}
+    if database_url:
+        entorno['DATABASE_URL'] = database_url
+    proceso = subprocess.Popen(comando, cwd=DIRECTORIO_APP, env=entorno)
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise SystemExit(f'{comando[2]} terminó con código {proceso.returncode}')
+        try:
+            conexion = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=2)
+            conexion.request('GET', '/login')
+            conexion.getresponse().read()
+            conexion.close()
+            return proceso
+        except OSError:
+            time.sleep(0.5)
+    proceso.terminate()
+    raise SystemExit(f'{comando[2]} no respondió en 60 segundos')
+
+
+def comando_gunicorn(url, aplicacion='app:app'):
+    partes = urlsplit(url)
+    return [sys.executable, '-m', 'gunicorn', aplicacion, '-c', os.path.join(RAIZ, 'gunicorn.conf.py'),
+            '-b', f'{partes.hostname}:{partes.port or 80}']
+
+
+def iniciar_gunicorn(args):
+    return iniciar_servidor(comando_gunicorn(args.url), args.url, args.database_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--gunicorn', action='store_true', help='Levantar gunicorn local en --url.')
+    parser.add_argument('--database-url', help='DATABASE_URL para el gunicorn de --gunicorn.')
+    parser.add_argument('-u', '--usuarios', type=int, default=16, help='Usuarios virtuales concurrentes.')
+    parser.add_argument('-d', '--duracion', type=float, default=60, help='Segundos de medición.')
+    parser.add_argument('--calentamiento', type=float, default=5, help='Segundos iniciales que no se miden.')
+    parser.add_argument('--pausa', type=float, default=0,
+                        help='Pausa media entre peticiones de un usuario (0 = máxima presión).')
+    parser.add_argument('--mezcla', type=leer_mezcla, default='anonimo=4,cliente=4,empleado=1,admin=1',
+                        help='Peso de cada recorrido.')
+    parser.add_argument('--compras', type=float, default=0.3,
+                        help='Probabilidad de que un recorrido de cliente cree un pedido.')
+    parser.add_argument('--clientes', type=int, default=100000)
+    parser.add_argument('--pedidos', type=int, default=1000000)
+    parser.add_argument('--empleados', type=int, default=20)
+    parser.add_argument('--administradores', type=int, default=2)
+    parser.add_argument('--contrasena', default=CONTRASENA)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', help='Guardar el resultado en este archivo JSON.')
+    parser.add_argument('--comparar', help='Resultado JSON de una ejecución anterior.')
+    args = parser.parse_args()
+
+    servidor = iniciar_gunicorn(args) if args.gunicorn else None
+    registro = Registro()
+    try:
+        inicio = time.monotonic()
+        limite = inicio + args.calentamiento + args.duracion
+        hilos = [threading.Thread(target=usuario_virtual, args=(i, args, registro, limite), daemon=True)
+                 for i in range(args.usuarios)]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(args.calentamiento)
+        registro.activo = True
+        medicion = time.monotonic()
+        for hilo in hilos:
+            hilo.join()
+        registro.activo = False
+        segundos = time.monotonic() - medicion
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    resultado = informe(args, registro, segundos)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+    imprimir(resultado, anterior)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(json.dumps(resultado['total'], ensure_ascii=False))
+    # Código de salida distinto de cero si hubo errores, para usarlo en scripts
+    sys.exit(1 if resultado['total']['errores'] else 0)
+
+
+if __name__ == '__main__':
+    main()
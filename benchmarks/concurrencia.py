@@ -0,0 +1,251 @@
+"""Conexiones concurrentes que sostiene un nodo: WSGI (gthread) frente a ASGI.
+
+Levanta cada servidor de --servidores con --workers procesos sobre la base
+de --database-url (sembrada con benchmarks/datos.py) y lo somete a niveles
+crecientes de conexiones keep-alive simultáneas. Cada conexión pide sin
+pausa los endpoints públicos de lectura: rastreo de un pedido al azar
+(/api/pedidos/<id>/estado), catálogo (/api/productos) y /salud.
+
+    wsgi   gunicorn app:app (el despliegue actual, workers gthread)
+    asgi   gunicorn asgi:aplicacion con workers de uvicorn (app/asgi.py)
+
+Los dos usan gunicorn.conf.py, así que comparten WEB_CONCURRENCY y la
+cantidad de hilos para las vistas de Flask.
+
+Con --lentos se abren además conexiones que envían su petición de a un byte
+por segundo, como clientes móviles lentos: en gthread cada una ocupa un hilo
+mientras dura, en ASGI solo una corrutina.
+
+Por nivel se informan peticiones por segundo, errores y latencias p50/p95/
+p99; un nivel se sostiene si no hubo errores y el p95 no supera --p95-max.
+El cliente es un único proceso asyncio: en niveles muy altos puede ser él el
+límite, conviene ejecutarlo en otra máquina que el servidor (con --url y sin
+--servidores) para los números definitivos.
+
+Uso:
+    python benchmarks/datos.py --database-url sqlite:////tmp/luma_carga.db --pedidos 100000
+    python benchmarks/concurrencia.py --database-url sqlite:////tmp/luma_carga.db \\
+        --pedidos 100000 --niveles 16 64 256 1024 --salida concurrencia.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from carga import iniciar_servidor, comando_gunicorn, resumir
+
+# Peso de cada endpoint en la mezcla: el rastreo es el que se consulta en bucle
+MEZCLA = {'estado': 8, 'productos': 1, 'salud': 1}
+
+
+# Worker de gunicorn que atiende una aplicación ASGI
+WORKER_ASGI = 'uvicorn_worker.UvicornWorker'
+
+
+class Conexion:
+    """Conexión HTTP/1.1 keep-alive sobre asyncio, se reabre tras un error"""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.host, self.puerto = partes.hostname, partes.port or 80
+        self.lector = self.escritor = None
+
+    async def pedir(self, ruta):
+        """Devuelve el código de estado de GET `ruta`"""
+        if self.escritor is None:
+            self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+        self.escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: {self.host}\r\n\r\n'.encode())
+        encabezado = await self.lector.readuntil(b'\r\n\r\n')
+        lineas = encabezado.decode('latin1').split('\r\n')
+        codigo = int(lineas[0].split(' ', 2)[1])
+        cabeceras = {}
+        for linea in lineas[1:]:
+            if ':' in linea:
+                nombre, valor = linea.split(':', 1)
+                cabeceras[nombre.strip().lower()] = valor.strip()
+        if cabeceras.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                tamano = int((await self.lector.readuntil(b'\r\n')).split(b';')[0], 16)
+                await self.lector.readexactly(tamano + 2)
+                if not tamano:
+                    break
+        else:
+            await self.lector.readexactly(int(cabeceras.get('content-length', 0)))
+        if cabeceras.get('connection', '').lower() == 'close':
+            await self.cerrar()
+        return codigo
+
+    async def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+            try:
+                await self.escritor.wait_closed()
+            except OSError:
+                pass
+        self.lector = self.escritor = None
+
+
+class Nivel:
+    """Latencias y errores por endpoint de un nivel de concurrencia"""
+
+    def __init__(self):
+        self.latencias = {}
+        self.errores = {}
+        self.activo = False
+
+    def anotar(self, endpoint, segundos, error=None):
+        if not self.activo:
+            return
+        self.latencias.setdefault(endpoint, []).append(segundos)
+        if error is not None:
+            por_codigo = self.errores.setdefault(endpoint, {})
+            por_codigo[error] = por_codigo.get(error, 0) + 1
+
+    def resumen(self, conexiones, segundos):
+        todas = [latencia for latencias in self.latencias.values() for latencia in latencias]
+        errores = {}
+        for por_codigo in self.errores.values():
+            for codigo, cantidad in por_codigo.items():
+                errores[codigo] = errores.get(codigo, 0) + cantidad
+        return {
+            'conexiones': conexiones, **resumir(todas, errores, segundos), 'por_codigo': errores,
+            'endpoints': {endpoint: resumir(latencias, self.errores.get(endpoint, {}), segundos)
+                          for endpoint, latencias in sorted(self.latencias.items())},
+        }
+
+
+async def cliente(numero, args, nivel, limite):
+    azar = random.Random(args.semilla * 100000 + numero)
+    conexion = Conexion(args.url)
+    endpoints, pesos = zip(*MEZCLA.items())
+    try:
+        while time.monotonic() < limite:
+            endpoint = azar.choices(endpoints, pesos)[0]
+            ruta = {'estado': f'/api/pedidos/{azar.randint(1, args.pedidos)}/estado',
+                    'productos': '/api/productos', 'salud': '/salud'}[endpoint]
+            inicio = time.perf_counter()
+            try:
+                codigo = await asyncio.wait_for(conexion.pedir(ruta), args.timeout)
+                error = None if codigo == 200 else str(codigo)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                error = type(exc).__name__
+                await conexion.cerrar()
+            nivel.anotar(endpoint, time.perf_counter() - inicio, error)
+    finally:
+        await conexion.cerrar()
+
+
+async def cliente_lento(args, limite):
+    """Envía peticiones de a un byte por segundo hasta `limite`"""
+    partes = urlsplit(args.url)
+    peticion = f'GET /api/pedidos/1/estado HTTP/1.1\r\nHost: {partes.hostname}\r\n\r\n'.encode()
+    while time.monotonic() < limite:
+        try:
+            _, escritor = await asyncio.open_connection(partes.hostname, partes.port or 80)
+        except OSError:
+            await asyncio.sleep(1)
+            continue
+        try:
+            for byte in peticion:
+                if time.monotonic() >= limite:
+                    break
+                escritor.write(bytes([byte]))
+                await escritor.drain()
+                await asyncio.sleep(1)
+        except OSError:
+            pass
+        finally:
+            escritor.close()
+
+
+async def medir_nivel(args, conexiones):
+    nivel = Nivel()
+    inicio = time.monotonic()
+    limite = inicio + args.calentamiento + args.duracion
+    tareas = [asyncio.create_task(cliente(i, args, nivel, limite)) for i in range(conexiones)]
+    tareas += [asyncio.create_task(cliente_lento(args, limite)) for _ in range(args.lentos)]
+    await asyncio.sleep(args.calentamiento)
+    nivel.activo = True
+    medicion = time.monotonic()
+    await asyncio.sleep(max(0, limite - medicion))
+    nivel.activo = False
+    segundos = time.monotonic() - medicion
+    # Las peticiones que quedan en vuelo ya no se miden
+    await asyncio.wait(tareas, timeout=args.timeout)
+    for tarea in tareas:
+        tarea.cancel()
+    return nivel.resumen(conexiones, segundos)
+
+
+def sostenido(niveles, p95_max):
+    """Mayor cantidad de conexiones sin errores y con p95 <= p95_max"""
+    validos = [nivel['conexiones'] for nivel in niveles if not nivel['errores'] and nivel['p95_ms'] <= p95_max]
+    return max(validos, default=0)
+
+
+def imprimir(servidor, resultado, detalle=False):
+    """Tabla legible en stderr; con `detalle`, también por endpoint"""
+    print(f"{servidor:<10} {'conex':>6} {'n':>8} {'err':>6} {'rps':>8} {'p50':>7} {'p95':>8} {'p99':>8}",
+          file=sys.stderr)
+    for nivel in resultado['niveles']:
+        filas = [('', nivel)] + (list(nivel['endpoints'].items()) if detalle else [])
+        for nombre, datos in filas:
+            conexiones = '' if nombre else nivel['conexiones']
+            print(f"{nombre:>10} {conexiones:>6} {datos['peticiones']:>8} {datos['errores']:>6} {datos['rps']:>8} "
+                  f"{datos['p50_ms']:>7} {datos['p95_ms']:>8} {datos['p99_ms']:>8}", file=sys.stderr)
+    print(f"{'':<10} sostiene {resultado['sostenido']} conexiones", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--servidores', nargs='*', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'],
+                        help='Servidores a levantar en --url; sin valores se mide el que ya esté en --url.')
+    parser.add_argument('--database-url', help='DATABASE_URL de los servidores levantados.')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '2')),
+                        help='Procesos de cada servidor.')
+    parser.add_argument('--niveles', type=int, nargs='+', default=[16, 64, 256, 1024],
+                        help='Conexiones simultáneas de cada nivel.')
+    parser.add_argument('--lentos', type=int, default=0, help='Conexiones lentas abiertas durante cada nivel.')
+    parser.add_argument('-d', '--duracion', type=float, default=20, help='Segundos de medición por nivel.')
+    parser.add_argument('--calentamiento', type=float, default=3)
+    parser.add_argument('--timeout', type=float, default=10, help='Segundos antes de contar una petición como error.')
+    parser.add_argument('--p95-max', type=float, default=500, help='p95 máximo (ms) de un nivel sostenido.')
+    parser.add_argument('--pedidos', type=int, default=1000000, help='Ids de pedido entre 1 y este valor.')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--detalle', action='store_true', help='Mostrar cada endpoint por separado.')
+    parser.add_argument('--salida', help='Guardar el resultado en este archivo JSON.')
+    args = parser.parse_args()
+
+    resultados = {}
+    for servidor in args.servidores or ['url']:
+        proceso = None
+        if servidor == 'wsgi':
+            proceso = iniciar_servidor(comando_gunicorn(args.url), args.url, args.database_url,
+                                       {'WEB_CONCURRENCY': str(args.workers)})
+        elif servidor == 'asgi':
+            proceso = iniciar_servidor(comando_gunicorn(args.url, 'asgi:aplicacion'), args.url, args.database_url,
+                                       {'WEB_CONCURRENCY': str(args.workers), 'GUNICORN_WORKER_CLASS': WORKER_ASGI})
+        try:
+            niveles = [asyncio.run(medir_nivel(args, conexiones)) for conexiones in args.niveles]
+        finally:
+            if proceso is not None:
+                proceso.terminate()
+                proceso.wait()
+        resultados[servidor] = {'niveles': niveles, 'sostenido': sostenido(niveles, args.p95_max)}
+        imprimir(servidor, resultados[servidor], args.detalle)
+
+    resultado = {'url': args.url, 'workers': args.workers, 'lentos': args.lentos, 'duracion_s': args.duracion,
+                 'p95_max_ms': args.p95_max, 'servidores': resultados}
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(json.dumps({servidor: datos['sostenido'] for servidor, datos in resultados.items()}))
+
+
+if __name__ == '__main__':
+    main()
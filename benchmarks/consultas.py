@@ -0,0 +1,279 @@
+"""Micro-benchmarks de los caminos de acceso a datos de app.py, con referencias.
+
+Cada camino (listados de pedidos, rastreo, panel, carga del usuario de la
+sesión, alta y edición de pedidos, búsqueda) se ejecuta aislado sobre una
+base SQLite temporal sembrada con benchmarks/datos.py. Las vistas se piden
+con el cliente de pruebas de Flask, así se cuentan también las consultas
+que disparan las plantillas (una carga perezosa nueva suma sentencias).
+Antes de cada repetición se vacía la caché que corresponde al camino.
+
+Por camino se registran las sentencias SQL y la mediana y el p95 del tiempo,
+y se comparan con benchmarks/referencias/consultas.json. Sale con código 1
+si un camino emite más sentencias que su referencia o si su mediana supera
+la referencia en más de --tolerancia. Los tiempos solo son comparables en
+la misma máquina; con --solo-sentencias se controla únicamente el conteo.
+
+Uso:
+    python benchmarks/consultas.py                    # comparar con la referencia
+    python benchmarks/consultas.py --solo-sentencias  # en CI u otra máquina
+    python benchmarks/consultas.py --actualizar       # regrabar la referencia
+    python benchmarks/consultas.py --caminos mis_pedidos --actualizar  # solo ese camino
+    python benchmarks/consultas.py --caminos mis_pedidos rastreo_api --detalle
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from datos import sembrar
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_APP = os.path.join(DIRECTORIO, '..', 'app')
+REFERENCIA = os.path.join(DIRECTORIO, 'referencias', 'consultas.json')
+
+# Volumen de la base: suficiente para que los listados se paginen y las
+# agregaciones recorran datos, y corto de sembrar
+PEDIDOS = 5000
+CLIENTES = 500
+# Diferencia mínima de tiempo que se considera regresión
+MARGEN_MS = 1.0
+
+
+class Caminos:
+    """Un método por camino; cada uno ejecuta una vez el acceso a medir"""
+
+    def __init__(self, m):
+        from sqlalchemy import select, func
+        from models import db, Usuario, Cliente, Pedido
+
+        self.m = m
+        self.admin = db.session.scalar(select(Usuario.id_usuario).where(Usuario.correo == 'admin1@luma.test'))
+        self.empleado = db.session.scalar(
+            select(Usuario.id_usuario).where(Usuario.correo == 'empleado1@luma.test'))
+        # El cliente con más pedidos: el peor caso de mis_pedidos
+        self.id_cliente, self.cliente = db.session.execute(
+            select(Cliente.id_cliente, Cliente.id_usuario)
+            .join(Pedido, Pedido.id_cliente == Cliente.id_cliente)
+            .group_by(Cliente.id_cliente, Cliente.id_usuario)
+            .order_by(func.count().desc(), Cliente.id_cliente)
+            .limit(1)
+        ).one()
+        self.pedido = db.session.scalar(
+            select(func.max(Pedido.id_pedido)).where(Pedido.id_cliente == self.id_cliente))
+        self.clientes_http = {}
+        self._alternar = False
+
+    def _http(self, id_usuario):
+        """Cliente de pruebas con la sesión iniciada (sin calcular hashes)"""
+        if id_usuario not in self.clientes_http:
+            cliente = self.m.app.test_client()
+            with cliente.session_transaction() as sesion:
+                sesion['_user_id'] = str(id_usuario)
+                sesion['_fresh'] = True
+            self.clientes_http[id_usuario] = cliente
+        return self.clientes_http[id_usuario]
+
+    def _pedir(self, id_usuario, ruta, datos=None, esperado=200):
+        cliente = self._http(id_usuario)
+        respuesta = cliente.post(ruta, data=datos) if datos is not None else cliente.get(ruta)
+        if respuesta.status_code != esperado:
+            raise RuntimeError(f'{ruta}: respondió {respuesta.status_code}, se esperaba {esperado}')
+
+    def _vaciar(self, *caches):
+        for cache in caches:
+            cache.invalidar()
+
+    # ---- Listados de pedidos ----
+
+    def pedidos_admin(self):
+        self._pedir(self.admin, '/admin/pedidos')
+
+    def pedidos_admin_por_total(self):
+        self._pedir(self.admin, '/admin/pedidos?orden=total')
+
+    def pedidos_empleado(self):
+        self._pedir(self.empleado, '/empleado/pedidos')
+
+    def mis_pedidos(self):
+        self._pedir(self.cliente, '/mis_pedidos')
+
+    # ---- Rastreo ----
+
+    def rastreo_pagina(self):
+        self._pedir(self.cliente, f'/rastrear_pedido?id={self.pedido}')
+
+    def rastreo_api(self):
+        self._vaciar(self.m.rastreo_cache)
+        self._pedir(self.cliente, f'/api/pedidos/{self.pedido}/estado')
+
+    # ---- Paneles ----
+
+    def panel_admin(self):
+        self._vaciar(self.m.estadisticas_cache)
+        self._pedir(self.admin, '/admin_panel')
+
+    def reportes(self):
+        self._pedir(self.admin, '/admin/reportes')
+
+    # ---- Usuario de la sesión ----
+
+    def carga_usuario(self):
+        self._vaciar(self.m.usuarios_cache)
+        with self.m.app.app_context():
+            self.m.load_user(str(self.cliente))
+
+    # ---- Escrituras ----
+
+    def realizar_pedido(self):
+        self._pedir(self.cliente, '/realizar_pedido',
+                    {'productos': ['1', '2', '3'], 'cantidades': ['1', '2', '1']}, esperado=302)
+
+    def editar_pedido(self):
+        self._pedir(self.empleado, f'/empleado/pedidos/editar/{self.pedido}', {
+            'id_cliente': str(self.id_cliente), 'estado': 'en_proceso',
+            'productos[]': ['4', '5'], 'cantidades[]': ['2', '1'],
+        }, esperado=302)
+
+    def actualizar_estado(self):
+        # Alterna entre dos estados para que siempre haya un cambio que notificar
+        self._alternar = not self._alternar
+        self._pedir(self.empleado, f'/empleado/pedidos/{self.pedido}/actualizar', {
+            'estado': 'pendiente' if self._alternar else 'en_proceso', 'comentario': 'Benchmark',
+        }, esperado=302)
+
+    # ---- Búsqueda ----
+
+    def buscar(self):
+        self._pedir(self.empleado, '/buscar?q=Garc%C3%ADa')
+
+
+CAMINOS = [
+    'pedidos_admin', 'pedidos_admin_por_total', 'pedidos_empleado', 'mis_pedidos',
+    'rastreo_pagina', 'rastreo_api', 'panel_admin', 'reportes', 'carga_usuario',
+    'realizar_pedido', 'editar_pedido', 'actualizar_estado', 'buscar',
+]
+
+
+def medir(funcion, repeticiones, motor):
+    """Ejecuta `funcion` una vez para calentar y luego `repeticiones` veces.
+
+    Devuelve (sentencias por ejecución, tiempos en segundos, sentencias de la
+    última ejecución).
+    """
+    from sqlalchemy import event
+
+    sentencias = []
+
+    def anotar(conexion, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(motor, 'before_cursor_execute', anotar)
+    try:
+        funcion()
+        conteos, tiempos = [], []
+        for _ in range(repeticiones):
+            sentencias.clear()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+            conteos.append(len(sentencias))
+        return conteos, tiempos, list(sentencias)
+    finally:
+        event.remove(motor, 'before_cursor_execute', anotar)
+
+
+def comparar(nombre, actual, referencia, tolerancia, solo_sentencias):
+    """Lista de problemas de `actual` frente a `referencia` (vacía si pasa)"""
+    if referencia is None:
+        return []
+    problemas = []
+    if actual['sentencias'] > referencia['sentencias']:
+        problemas.append(f"{nombre}: {actual['sentencias']} sentencias (referencia {referencia['sentencias']})")
+    limite = referencia['mediana_ms'] * (1 + tolerancia)
+    if not solo_sentencias and actual['mediana_ms'] > max(limite, referencia['mediana_ms'] + MARGEN_MS):
+        problemas.append(f"{nombre}: mediana {actual['mediana_ms']} ms "
+                         f"(referencia {referencia['mediana_ms']} ms, límite {round(limite, 2)} ms)")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--repeticiones', type=int, default=20)
+    parser.add_argument('--caminos', nargs='+', choices=CAMINOS, default=CAMINOS)
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help='Aumento relativo de la mediana que se admite (0.5 = 50%%).')
+    parser.add_argument('--solo-sentencias', action='store_true', help='No comparar tiempos.')
+    parser.add_argument('--actualizar', action='store_true', help='Guardar los resultados como referencia.')
+    parser.add_argument('--referencia', default=REFERENCIA)
+    parser.add_argument('--detalle', action='store_true', help='Mostrar las sentencias de cada camino.')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{directorio}/consultas.db'
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    os.environ['PAGE_CACHE'] = 'false'
+    sys.path.insert(0, DIRECTORIO_APP)
+    import app as m
+    import reportes
+
+    referencias = {}
+    if os.path.exists(args.referencia):
+        with open(args.referencia, encoding='utf-8') as archivo:
+            referencias = json.load(archivo)['caminos']
+    if args.actualizar:
+        # Se regraban solo los caminos medidos; los demás conservan su referencia
+        resultados_previos, referencias = referencias, {}
+
+    with m.app.app_context():
+        m.init_database()
+        sembrar(PEDIDOS, CLIENTES)
+        reportes.actualizar()
+        caminos = Caminos(m)
+        motor = m.db.engine
+
+    # Sin contexto de aplicación abierto: cada petición crea el suyo, como en
+    # producción (con uno abierto, g y el usuario de Flask-Login se comparten)
+    resultados, problemas = {}, []
+    for nombre in args.caminos:
+        conteos, tiempos, sentencias = medir(getattr(caminos, nombre), args.repeticiones, motor)
+        resultado = {
+            'sentencias': max(conteos),
+            'mediana_ms': round(statistics.median(tiempos) * 1000, 2),
+            'p95_ms': round(sorted(tiempos)[int(0.95 * (len(tiempos) - 1))] * 1000, 2),
+        }
+        resultados[nombre] = resultado
+        referencia = referencias.get(nombre)
+        fallas = comparar(nombre, resultado, referencia, args.tolerancia, args.solo_sentencias)
+        problemas.extend(fallas)
+        print(json.dumps({
+            'camino': nombre, **resultado,
+            'referencia': referencia,
+            'estado': 'sin referencia' if referencia is None else ('REGRESIÓN' if fallas else 'ok'),
+        }, ensure_ascii=False))
+        if min(conteos) != max(conteos):
+            print(f'  aviso: {nombre} emite entre {min(conteos)} y {max(conteos)} sentencias', file=sys.stderr)
+        if args.detalle or (referencia and resultado['sentencias'] > referencia['sentencias']):
+            for sentencia in sentencias:
+                print('    ' + ' '.join(sentencia.split())[:200], file=sys.stderr)
+
+    if args.actualizar:
+        os.makedirs(os.path.dirname(args.referencia), exist_ok=True)
+        with open(args.referencia, 'w', encoding='utf-8') as archivo:
+            json.dump({'pedidos': PEDIDOS, 'clientes': CLIENTES, 'repeticiones': args.repeticiones,
+                       'caminos': {**resultados_previos, **resultados}}, archivo, ensure_ascii=False, indent=2)
+            archivo.write('\n')
+        print(f'Referencia guardada en {args.referencia}', file=sys.stderr)
+        return
+
+    if problemas:
+        print('Regresiones:', file=sys.stderr)
+        for problema in problemas:
+            print(f'  {problema}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Mide el rendimiento de inicio de sesión con varios clientes concurrentes.
+
+Cada modo se ejecuta en un proceso nuevo sobre una base SQLite temporal:
+PASSWORD_HASH_WORKERS=0 calcula los hashes en el hilo de la petición y N>0
+en el pool de procesos. Además de los logins por segundo se mide la latencia
+de una página liviana (/login por GET) servida mientras tanto, que es lo que
+perciben los demás usuarios del worker.
+
+Uso:
+    python benchmarks/login.py --procesos 0 2 --concurrencia 8 --logins 80
+    PASSWORD_HASH_METHOD=pbkdf2:sha256:600000 python benchmarks/login.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DIRECTORIO_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+CODIGO_MEDICION = r'''
+import json, sys, threading, time
+import app as m
+from models import db, Usuario, TipoUsuario
+from metricas_pool import percentil
+
+concurrencia, logins = int(sys.argv[1]), int(sys.argv[2])
+app = m.app
+app.config['LOGIN_MAX_FALLOS_IP'] = 10 ** 9
+m.limitador_login.init_app(app)
+with app.app_context():
+    m.init_database()
+    tipo = TipoUsuario.query.filter_by(nombre='cliente').first()
+    hash_comun = m.contrasenas.generar('secreto123')
+    for i in range(concurrencia):
+        db.session.add(Usuario(nombre=f'u{i}', correo=f'u{i}@bench', id_tipo=tipo.id_tipo,
+                               contrasena_hash=hash_comun))
+    db.session.commit()
+
+latencias, livianas = [], []
+terminado = threading.Event()
+
+def cliente(i):
+    c = app.test_client()
+    for _ in range(logins // concurrencia):
+        inicio = time.perf_counter()
+        r = c.post('/login', data={'correo': f'u{i}@bench', 'password': 'secreto123'})
+        latencias.append(time.perf_counter() - inicio)
+        assert r.status_code == 302, r.status_code
+        c.get('/logout')
+
+def liviano():
+    c = app.test_client()
+    while not terminado.is_set():
+        inicio = time.perf_counter()
+        c.get('/login')
+        livianas.append(time.perf_counter() - inicio)
+        time.sleep(0.01)
+
+sonda = threading.Thread(target=liviano)
+sonda.start()
+hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(concurrencia)]
+inicio = time.perf_counter()
+for h in hilos:
+    h.start()
+for h in hilos:
+    h.join()
+total = time.perf_counter() - inicio
+terminado.set()
+sonda.join()
+m.contrasenas.cerrar()
+print(json.dumps({
+    'logins': len(latencias),
+    'segundos': total,
+    'login_p50_ms': percentil(latencias, 50) * 1000,
+    'login_p95_ms': percentil(latencias, 95) * 1000,
+    'liviana_p50_ms': percentil(livianas, 50) * 1000,
+    'liviana_p95_ms': percentil(livianas, 95) * 1000,
+}))
+'''
+
+
+def medir(procesos, concurrencia, logins):
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ,
+                       DATABASE_URL=f'sqlite:///{directorio}/login.db',
+                       PASSWORD_HASH_WORKERS=str(procesos))
+        salida = subprocess.run(
+            [sys.executable, '-c', CODIGO_MEDICION, str(concurrencia), str(logins)],
+            cwd=DIRECTORIO_APP, env=entorno, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+    return json.loads(salida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, nargs='+', default=[0, 2],
+                        help='valores de PASSWORD_HASH_WORKERS a comparar (0 = en el hilo de la petición)')
+    parser.add_argument('-c', '--concurrencia', type=int, default=8)
+    parser.add_argument('-n', '--logins', type=int, default=80)
+    args = parser.parse_args()
+
+    for procesos in args.procesos:
+        r = medir(procesos, args.concurrencia, args.logins)
+        print(json.dumps({
+            'modo': f'pool de {procesos} procesos' if procesos else 'hash en el hilo de la petición',
+            'metodo': os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+            'concurrencia': args.concurrencia,
+            'logins_por_segundo': round(r['logins'] / r['segundos'], 1),
+            'login_p50_ms': round(r['login_p50_ms'], 1),
+            'login_p95_ms': round(r['login_p95_ms'], 1),
+            'pagina_liviana_p50_ms': round(r['liviana_p50_ms'], 1),
+            'pagina_liviana_p95_ms': round(r['liviana_p95_ms'], 1),
+        }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# Configuración de gunicorn (se lee automáticamente desde el directorio actual)
+import os
+
+# Importar la app no hace E/S de base de datos, así que puede cargarse una sola
+# vez en el proceso maestro y compartirse entre workers; cada worker descarta
+# las conexiones heredadas tras el fork (ver app.py)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+
+# Hilos por worker: el tablero de pedidos mantiene conexiones SSE abiertas
+# (hasta 5 minutos cada una) que con workers síncronos bloquearían el proceso.
+# Como mucho la mitad de los hilos atiende tableros (EVENTOS_MAX_OYENTES).
+# El modo ASGI (app/asgi.py) usa uvicorn_worker.UvicornWorker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
@@ -0,0 +1,162 @@
+"""Fixtures de las pruebas: la app sobre dos archivos SQLite temporales.
+
+El entorno se fija antes de importar app.py, que lee su configuración al
+importarse. La réplica es otro archivo SQLite que solo se actualiza cuando
+una prueba llama a `replicar`, así se puede simular una réplica atrasada.
+"""
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+
+DIRECTORIO = tempfile.mkdtemp(prefix='luma-pruebas-')
+PRIMARIA = os.path.join(DIRECTORIO, 'primaria.db')
+REPLICA = os.path.join(DIRECTORIO, 'replica.db')
+
+
+def _puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+PUERTO_SMTP = _puerto_libre()
+
+os.environ.update({
+    'DATABASE_URL': f'sqlite:///{PRIMARIA}',
+    'DATABASE_REPLICA_URL': f'sqlite:///{REPLICA}',
+    'PASSWORD_HASH_WORKERS': '0',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1',
+    'PAGE_CACHE': 'false',
+    'MAIL_SERVER': '127.0.0.1',
+    'MAIL_PORT': str(PUERTO_SMTP),
+    'MAIL_USE_TLS': 'false',
+    # Sin credenciales aunque las defina el .env del repositorio
+    'MAIL_USERNAME': '',
+    'MAIL_PASSWORD': '',
+    'MAIL_DEFAULT_SENDER': 'luma@luma.test',
+    'ADMIN_EMAIL': 'admin@luma.test',
+})
+os.environ.pop('DB_DRIVER', None)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import app as m  # noqa: E402
+from models import db, TipoUsuario, Usuario, Cliente, Empleado, Producto  # noqa: E402
+from servicio_pedidos import registrar_pedido  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    with m.app.app_context():
+        m.init_database()
+    _copiar_primaria()
+    return m.app
+
+
+def _copiar_primaria():
+    origen, destino = sqlite3.connect(PRIMARIA), sqlite3.connect(REPLICA)
+    try:
+        origen.backup(destino)
+    finally:
+        origen.close()
+        destino.close()
+
+
+@pytest.fixture
+def replicar(app):
+    """Lleva a la réplica el contenido actual de la primaria"""
+    return _copiar_primaria
+
+
+@pytest.fixture
+def vaciar_caches():
+    """Vacía las cachés del proceso para que cada petición vaya a la base"""
+    def vaciar():
+        for cache in (m.usuarios_cache, m.estadisticas_cache, m.catalogo_cache, m.rastreo_cache):
+            cache.invalidar()
+    vaciar()
+    return vaciar
+
+
+@pytest.fixture
+def crear_usuario(app):
+    """Crea un usuario del tipo dado (con su cliente o empleado) y devuelve su id"""
+    def crear(tipo='cliente'):
+        with app.app_context():
+            id_tipo = db.session.scalar(select(TipoUsuario.id_tipo).where(TipoUsuario.nombre == tipo))
+            usuario = Usuario(nombre=f'{tipo.title()} de prueba', id_tipo=id_tipo, activo=True,
+                              correo=f'{tipo}-{os.urandom(4).hex()}@luma.test')
+            usuario.set_password('clave123')
+            db.session.add(usuario)
+            db.session.flush()
+            if tipo == 'cliente':
+                db.session.add(Cliente(id_usuario=usuario.id_usuario, telefono='555-0100'))
+            elif tipo == 'empleado':
+                db.session.add(Empleado(id_usuario=usuario.id_usuario, puesto='Producción'))
+            db.session.commit()
+            return usuario.id_usuario
+    return crear
+
+
+@pytest.fixture(scope='session')
+def productos(app):
+    """Ids de dos productos con stock de sobra"""
+    with app.app_context():
+        nuevos = [Producto(nombre='Taza sublimada', precio=1500, stock=1000000),
+                  Producto(nombre='Remera estampada', precio=4200, stock=1000000)]
+        db.session.add_all(nuevos)
+        db.session.commit()
+        return [producto.id_producto for producto in nuevos]
+
+
+@pytest.fixture
+def crear_pedidos(app, productos):
+    """Crea `cantidad` pedidos de dos líneas para el cliente del usuario dado"""
+    def crear(id_usuario, cantidad):
+        with app.app_context():
+            id_cliente = db.session.scalar(select(Cliente.id_cliente).where(Cliente.id_usuario == id_usuario))
+            pedidos = [registrar_pedido(id_cliente, {productos[0]: 1, productos[1]: 2}).id_pedido
+                       for _ in range(cantidad)]
+            db.session.commit()
+            return pedidos
+    return crear
+
+
+@pytest.fixture
+def cliente_http(app):
+    """Cliente de pruebas con la sesión del usuario iniciada (sin pasar por el login)"""
+    def crear(id_usuario=None):
+        cliente = app.test_client()
+        if id_usuario is not None:
+            with cliente.session_transaction() as sesion:
+                sesion['_user_id'] = str(id_usuario)
+                sesion['_fresh'] = True
+        return cliente
+    return crear
+
+
+@pytest.fixture
+def contar_sentencias(app):
+    """Context manager que anota las sentencias SQL emitidas, por motor"""
+    @contextmanager
+    def contar():
+        sentencias = {'primaria': [], 'replica': []}
+        with app.app_context():
+            motores = {'primaria': db.engines[None], 'replica': db.engines['replica']}
+        anotadores = {}
+        for nombre, motor in motores.items():
+            def anotar(conexion, cursor, sentencia, *args, _nombre=nombre):
+                sentencias[_nombre].append(sentencia)
+            anotadores[nombre] = anotar
+            event.listen(motor, 'before_cursor_execute', anotar)
+        try:
+            yield sentencias
+        finally:
+            for nombre, motor in motores.items():
+                event.remove(motor, 'before_cursor_execute', anotadores[nombre])
+    return contar
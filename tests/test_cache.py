@@ -0,0 +1,29 @@
+"""Invalidación de las cachés del proceso al confirmar escrituras (cache.py)."""
+import io
+
+from sqlalchemy import insert
+
+import app as m
+import importacion
+from models import db, Producto
+
+
+def test_importar_productos_invalida_estadisticas_y_catalogo(app, vaciar_caches):
+    with app.app_context():
+        productos = m.obtener_estadisticas()['productos']
+        m.catalogo_cache.set('catalogo', [])
+
+        archivo = io.StringIO('nombre,precio,stock\nLlavero acrílico,800,50\nImán full color,650,80\n')
+        resultado = importacion.importar('productos', archivo, 'csv')
+        assert resultado.insertadas == 2
+
+        assert m.obtener_estadisticas()['productos'] == productos + 2
+        assert m.catalogo_cache.get('catalogo') is None
+
+
+def test_insert_masivo_revertido_no_invalida(app, vaciar_caches):
+    with app.app_context():
+        m.estadisticas_cache.set('panel', {'productos': 0})
+        db.session.execute(insert(Producto), [{'nombre': 'Sin confirmar', 'precio': 1, 'stock': 1}])
+        db.session.rollback()
+        assert m.estadisticas_cache.get('panel') == {'productos': 0}
@@ -0,0 +1,20 @@
+"""Conteo de sentencias por camino frente a benchmarks/referencias/consultas.json.
+
+benchmarks/consultas.py configura e importa la app por su cuenta sobre su
+propia base sembrada, así que se ejecuta en otro proceso.
+"""
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_ningun_camino_supera_su_referencia_de_sentencias():
+    # Sin la réplica de las pruebas: la referencia se tomó solo con la primaria
+    entorno = {clave: valor for clave, valor in os.environ.items() if clave != 'DATABASE_REPLICA_URL'}
+    proceso = subprocess.run(
+        [sys.executable, os.path.join(RAIZ, 'benchmarks', 'consultas.py'), '--solo-sentencias', '-n', '3'],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, timeout=300,
+    )
+    assert proceso.returncode == 0, proceso.stdout + proceso.stderr
@@ -0,0 +1,36 @@
+"""Límite de tableros SSE conectados por worker (eventos_pedidos.py)."""
+import pytest
+
+import app as m
+
+
+@pytest.fixture
+def limite_dos(app):
+    anterior = m.eventos_pedidos.max_oyentes
+    m.eventos_pedidos.max_oyentes = 2
+    yield
+    m.eventos_pedidos.max_oyentes = anterior
+
+
+def test_por_encima_del_limite_responde_503_con_retry(app, limite_dos, crear_usuario, cliente_http):
+    http = cliente_http(crear_usuario('empleado'))
+    # Sin leer el cuerpo, las conexiones quedan abiertas como las de un tablero
+    abiertas = [http.get('/empleado/pedidos/eventos?ultimo=0', buffered=False) for _ in range(2)]
+    assert [respuesta.status_code for respuesta in abiertas] == [200, 200]
+
+    rechazada = http.get('/empleado/pedidos/eventos?ultimo=0')
+    assert rechazada.status_code == 503
+    assert rechazada.headers['Retry-After'] == str(m.ESPERA_SATURADO)
+    assert rechazada.mimetype == 'text/event-stream'
+    assert rechazada.get_data(as_text=True).startswith('retry: ')
+
+    # Al cerrarse una conexión se libera su lugar
+    abiertas.pop().close()
+    otra = http.get('/empleado/pedidos/eventos?ultimo=0', buffered=False)
+    assert otra.status_code == 200
+    for respuesta in abiertas + [otra]:
+        respuesta.close()
+    # Todas cerradas: vuelven a entrar dos
+    assert [m.eventos_pedidos.reservar() for _ in range(3)] == [True, True, False]
+    m.eventos_pedidos.liberar()
+    m.eventos_pedidos.liberar()
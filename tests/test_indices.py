@@ -0,0 +1,57 @@
+"""Las consultas frecuentes usan los índices de models.py (EXPLAIN QUERY PLAN de SQLite)."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, func
+
+import app as m
+import reportes
+from models import db, Pedido, Cliente, Empleado, DetallePedido, SeguimientoPedido
+
+MARCA = datetime(2026, 1, 1)
+
+CONSULTAS = [
+    # mis_pedidos
+    ('ix_pedidos_cliente_fecha', lambda: select(Pedido).where(Pedido.id_cliente == 1).order_by(Pedido.fecha.desc())),
+    # listados paginados
+    ('ix_pedidos_fecha_id',
+     lambda: select(Pedido).order_by(Pedido.fecha.desc(), Pedido.id_pedido.desc()).limit(20)),
+    ('ix_pedidos_total_id',
+     lambda: select(Pedido).order_by(Pedido.total.desc(), Pedido.id_pedido.desc()).limit(20)),
+    # conteos y filtros por estado
+    ('ix_pedidos_estado_fecha', lambda: select(func.count()).select_from(Pedido).where(Pedido.estado == 'pendiente')),
+    ('ix_pedidos_estado_fecha',
+     lambda: select(Pedido).where(Pedido.estado == 'pendiente').order_by(Pedido.fecha.desc())),
+    # carga de detalles con selectinload
+    ('ix_detalle_pedido_id_pedido', lambda: select(DetallePedido).where(DetallePedido.id_pedido.in_([1, 2, 3]))),
+    # historial de rastrear_pedido
+    ('ix_seguimiento_pedido_fecha',
+     lambda: select(SeguimientoPedido).where(SeguimientoPedido.id_pedido == 1).order_by(SeguimientoPedido.fecha)),
+    ('ix_seguimiento_pedido_fecha', lambda: m.consulta_rastreo(1)),
+    # actualización incremental de reportes: solo los seguimientos desde la marca
+    ('ix_seguimiento_fecha', lambda: select(func.max(SeguimientoPedido.fecha))),
+    ('ix_seguimiento_fecha',
+     lambda: select(SeguimientoPedido.estado).where(SeguimientoPedido.fecha >= MARCA,
+                                                    SeguimientoPedido.fecha < datetime(2026, 2, 1))),
+    ('ix_seguimiento_fecha', lambda: reportes.consulta_fechas_cambiadas(MARCA, MARCA)),
+    # cliente y empleado del usuario de la sesión
+    ('ix_clientes_id_usuario', lambda: select(Cliente).where(Cliente.id_usuario == 1)),
+    ('ix_empleados_id_usuario', lambda: select(Empleado).where(Empleado.id_usuario == 1)),
+]
+
+
+def plan(consulta):
+    """Líneas de EXPLAIN QUERY PLAN de la consulta en la base primaria"""
+    sql = consulta.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    with db.engine.connect() as conexion:
+        return [fila[-1] for fila in conexion.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+
+
+@pytest.mark.parametrize('indice, consulta', CONSULTAS)
+def test_consulta_usa_indice(app, indice, consulta):
+    with app.app_context():
+        lineas = plan(consulta())
+    assert any(indice in linea for linea in lineas), lineas
+    # Sin recorridos completos de tablas ni ordenamientos en memoria
+    assert not [linea for linea in lineas if linea.startswith('SCAN') and 'INDEX' not in linea], lineas
+    assert not [linea for linea in lineas if 'TEMP B-TREE FOR ORDER BY' in linea], lineas
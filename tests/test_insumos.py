@@ -0,0 +1,43 @@
+"""Consumo de insumos según la lista de materiales de cada producto."""
+import pytest
+from sqlalchemy import select, func
+
+from models import db, Cliente, Insumo, InsumoProducto, Pedido, Producto
+
+
+@pytest.fixture
+def producto_con_insumo(app):
+    """(id_producto, id_insumo): cada unidad del producto consume 2 del insumo, que arranca en 100"""
+    with app.app_context():
+        insumo = Insumo(nombre='Taza blanca', cantidad=100, unidad='unidades')
+        producto = Producto(nombre='Taza con logo', precio=2000, stock=1000)
+        producto.insumos.append(InsumoProducto(insumo=insumo, cantidad=2))
+        db.session.add(producto)
+        db.session.commit()
+        return producto.id_producto, insumo.id_insumo
+
+
+def _crear_pedido(app, http, id_usuario, id_producto, estado):
+    with app.app_context():
+        id_cliente = db.session.scalar(select(Cliente.id_cliente).where(Cliente.id_usuario == id_usuario))
+    respuesta = http.post('/empleado/pedidos/crear', data={
+        'id_cliente': str(id_cliente), 'estado': estado,
+        'productos[]': [str(id_producto)], 'cantidades[]': ['5'],
+    })
+    assert respuesta.status_code == 302
+    with app.app_context():
+        return db.session.get(Pedido, db.session.scalar(
+            select(func.max(Pedido.id_pedido)).where(Pedido.id_cliente == id_cliente)))
+
+
+@pytest.mark.parametrize('estado, restante', [('en_produccion', 90), ('entregado', 90), ('pendiente', 100)])
+def test_pedido_creado_en_produccion_consume_insumos(app, crear_usuario, cliente_http, producto_con_insumo,
+                                                     estado, restante):
+    id_producto, id_insumo = producto_con_insumo
+    http = cliente_http(crear_usuario('empleado'))
+    pedido = _crear_pedido(app, http, crear_usuario('cliente'), id_producto, estado)
+
+    with app.app_context():
+        assert db.session.get(Insumo, id_insumo).cantidad == restante
+    assert pedido.estado == estado
+    assert pedido.insumos_consumidos == (restante != 100)
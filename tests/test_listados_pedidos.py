@@ -0,0 +1,30 @@
+"""Los listados de pedidos emiten un número fijo de sentencias (sin N+1)."""
+import pytest
+
+LISTADOS = [
+    ('cliente', '/mis_pedidos'),
+    ('admin', '/admin/pedidos'),
+    ('empleado', '/empleado/pedidos'),
+    ('empleado', '/empleado_panel'),
+]
+
+
+@pytest.mark.parametrize('tipo, ruta', LISTADOS)
+def test_sentencias_no_crecen_con_los_pedidos(tipo, ruta, crear_usuario, crear_pedidos, cliente_http,
+                                               replicar, vaciar_caches, contar_sentencias):
+    cliente = crear_usuario('cliente')
+    usuario = cliente if tipo == 'cliente' else crear_usuario(tipo)
+    http = cliente_http(usuario)
+
+    def sentencias_con(pedidos):
+        crear_pedidos(cliente, pedidos)
+        replicar()
+        vaciar_caches()
+        with contar_sentencias() as sentencias:
+            respuesta = http.get(ruta)
+        assert respuesta.status_code == 200
+        return sum(len(lista) for lista in sentencias.values())
+
+    pocos = sentencias_con(2)
+    muchos = sentencias_con(30)
+    assert muchos == pocos
@@ -0,0 +1,77 @@
+"""Métricas del pool de conexiones (metricas_pool.py) y su vista /admin/pool."""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from metricas_pool import QueuePoolInstrumentado
+
+
+@pytest.fixture
+def motor(tmp_path):
+    motor = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=QueuePoolInstrumentado,
+                          pool_size=1, max_overflow=1, pool_timeout=0.3, pool_pre_ping=True)
+    yield motor
+    motor.dispose()
+
+
+def test_checkouts_en_uso_y_espera_con_conexiones_concurrentes(motor):
+    pool = motor.pool
+    ocupadas = [motor.connect(), motor.connect()]
+    assert pool.metricas()['en_uso'] == 2
+    # Abrir conexiones nuevas no cuenta como espera
+    assert pool.metricas()['espera_max_ms'] < 100
+
+    # Un tercer hilo espera hasta que se devuelve una conexión
+    obtenida = threading.Event()
+
+    def esperar():
+        with motor.connect():
+            obtenida.set()
+
+    hilo = threading.Thread(target=esperar)
+    hilo.start()
+    assert not obtenida.wait(0.15)
+    ocupadas.pop().close()
+    hilo.join()
+    assert obtenida.is_set()
+
+    metricas = pool.metricas()
+    assert metricas['checkouts'] == 3
+    assert metricas['max_en_uso'] == 2
+    assert metricas['en_uso'] == 1
+    assert metricas['espera_max_ms'] >= 100
+    assert metricas['timeouts'] == 0
+    ocupadas.pop().close()
+
+
+def test_cuenta_solo_los_timeouts_del_pool(motor):
+    ocupadas = [motor.connect(), motor.connect()]
+    with pytest.raises(exc.TimeoutError):
+        motor.connect()
+    for conexion in ocupadas:
+        conexion.close()
+    assert motor.pool.metricas()['timeouts'] == 1
+
+
+def test_error_al_abrir_conexion_no_es_timeout():
+    def sin_servidor():
+        raise RuntimeError('sin servidor')
+
+    motor = create_engine('sqlite://', creator=sin_servidor, poolclass=QueuePoolInstrumentado)
+    with pytest.raises(RuntimeError):
+        motor.connect()
+    assert motor.pool.metricas()['timeouts'] == 0
+
+
+@pytest.mark.parametrize('tipo', [None, 'cliente', 'empleado'])
+def test_admin_pool_solo_para_administradores(app, crear_usuario, cliente_http, tipo):
+    respuesta = cliente_http(tipo and crear_usuario(tipo)).get('/admin/pool')
+    assert respuesta.status_code == 302
+    assert not respuesta.is_json
+
+
+def test_admin_pool_para_administradores(app, crear_usuario, cliente_http):
+    respuesta = cliente_http(crear_usuario('admin')).get('/admin/pool')
+    assert respuesta.status_code == 200
+    assert {'checkouts', 'en_uso', 'espera_p95_ms', 'timeouts'} <= set(respuesta.get_json())
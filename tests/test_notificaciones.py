@@ -0,0 +1,99 @@
+"""Bandeja de salida de correos contra un servidor SMTP local (aiosmtpd)."""
+from datetime import datetime
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select, func
+
+import app as m
+import notificaciones
+from conftest import PUERTO_SMTP
+from models import db, Notificacion, SeguimientoPedido
+
+
+class Buzon:
+    """Handler de aiosmtpd que guarda los mensajes recibidos"""
+
+    def __init__(self):
+        self.mensajes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensajes.append(envelope)
+        return '250 OK'
+
+
+@pytest.fixture
+def servidor_smtp():
+    buzon = Buzon()
+    controlador = Controller(buzon, hostname='127.0.0.1', port=PUERTO_SMTP)
+    controlador.start()
+    try:
+        yield buzon
+    finally:
+        controlador.stop()
+
+
+def _notificacion_del_pedido(id_pedido):
+    """Aviso del último cambio de estado del pedido"""
+    id_seguimiento = db.session.scalar(
+        select(func.max(SeguimientoPedido.id_seguimiento)).where(SeguimientoPedido.id_pedido == id_pedido))
+    return db.session.scalar(select(Notificacion).where(Notificacion.clave == f'seguimiento:{id_seguimiento}'))
+
+
+def _cambiar_estado(http, id_pedido, estado):
+    respuesta = http.post(f'/empleado/pedidos/{id_pedido}/actualizar',
+                          data={'estado': estado, 'comentario': 'Diseño aprobado'})
+    assert respuesta.status_code == 302
+
+
+def test_cambio_de_estado_se_envia_fuera_de_la_peticion(app, crear_usuario, crear_pedidos, cliente_http,
+                                                         servidor_smtp):
+    [id_pedido] = crear_pedidos(crear_usuario('cliente'), 1)
+    _cambiar_estado(cliente_http(crear_usuario('empleado')), id_pedido, 'en_proceso')
+    # La vista solo encola: todavía no llegó nada al servidor SMTP
+    assert servidor_smtp.mensajes == []
+
+    with app.app_context():
+        assert _notificacion_del_pedido(id_pedido).estado == 'pendiente'
+        enviadas, fallidas = notificaciones.enviar_pendientes(m.mail)
+        notificacion = _notificacion_del_pedido(id_pedido)
+        assert enviadas >= 1 and fallidas == 0
+        assert notificacion.estado == 'enviado'
+        assert notificacion.fecha_envio is not None
+
+    [mensaje] = [mensaje for mensaje in servidor_smtp.mensajes if notificacion.destinatario in mensaje.rcpt_tos]
+    assert f'pedido #{id_pedido}'.encode() in mensaje.content
+
+
+def test_sin_servidor_smtp_se_reprograma(app, crear_usuario, crear_pedidos, cliente_http):
+    [id_pedido] = crear_pedidos(crear_usuario('cliente'), 1)
+    _cambiar_estado(cliente_http(crear_usuario('empleado')), id_pedido, 'en_proceso')
+
+    with app.app_context():
+        antes = datetime.utcnow()
+        enviadas, fallidas = notificaciones.enviar_pendientes(m.mail)
+        notificacion = _notificacion_del_pedido(id_pedido)
+        assert enviadas == 0 and fallidas >= 1
+        assert notificacion.estado == 'pendiente'
+        assert notificacion.intentos == 1
+        assert notificacion.ultimo_error
+        assert notificacion.proximo_intento >= antes + notificaciones.BACKOFF_BASE
+        # No vuelve a intentarse antes de que venza la espera
+        notificaciones.enviar_pendientes(m.mail)
+        assert _notificacion_del_pedido(id_pedido).intentos == 1
+
+
+def test_formulario_de_contacto_no_duplica(app, cliente_http):
+    http = cliente_http()
+    datos = {'nombre': 'Ana', 'email': 'ana@luma.test', 'asunto': 'Presupuesto',
+             'mensaje': f'Quisiera cotizar 100 tazas ({datetime.utcnow().isoformat()})'}
+
+    assert http.post('/enviar-formulario', data=datos).status_code == 200
+    assert http.post('/enviar-formulario', data=datos).status_code == 409
+    assert http.post('/enviar-formulario', data={**datos, 'mensaje': datos['mensaje'] + '.'}).status_code == 200
+
+    with app.app_context():
+        recibidos = db.session.scalar(
+            select(func.count()).select_from(Notificacion).where(Notificacion.responder_a == 'ana@luma.test',
+                                                                 Notificacion.cuerpo.contains(datos['mensaje'])))
+    assert recibidos == 2
@@ -0,0 +1,36 @@
+"""Medición de consultas por petición (perfilador.py)."""
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, exc, text
+
+from perfilador import Perfilador
+
+
+@pytest.fixture
+def perfilada(tmp_path):
+    motor = create_engine(f'sqlite:///{tmp_path / "perfil.db"}')
+    aplicacion = Flask(__name__)
+    aplicacion.config['PERFIL_SQL'] = True
+    Perfilador(aplicacion)
+    restos = []
+
+    @aplicacion.route('/consultas')
+    def consultas():
+        with motor.connect() as conexion:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conexion.execute(text('SELECT * FROM no_existe'))
+            conexion.execute(text('SELECT 1'))
+            restos.append(dict(conexion.connection.info))
+        return 'ok'
+
+    yield aplicacion, restos
+    motor.dispose()
+
+
+def test_sentencia_fallida_no_deja_inicios_en_la_conexion(perfilada):
+    aplicacion, restos = perfilada
+    for _ in range(2):
+        respuesta = aplicacion.test_client().get('/consultas')
+        assert '"1 consultas"' in respuesta.headers['Server-Timing']
+    assert restos == [{}, {}]
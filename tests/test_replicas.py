@@ -0,0 +1,94 @@
+"""Enrutamiento de lecturas a la réplica (replicas.py) con dos archivos SQLite."""
+import time
+
+from flask import Flask, g
+from sqlalchemy import select, func
+
+from models import db, Cliente, Pedido
+from replicas import EnrutadorReplicas, CLAVE_ESCRITURA
+
+
+def _ultimo_pedido(app, id_usuario):
+    with app.app_context():
+        return db.session.scalar(
+            select(func.max(Pedido.id_pedido)).join(Cliente).where(Cliente.id_usuario == id_usuario))
+
+
+def _pedidos(sentencias):
+    """Sentencias que leen pedidos (el usuario de la sesión se carga antes de
+    @solo_lectura, desde la primaria)"""
+    return [sentencia for sentencia in sentencias if 'FROM pedidos' in sentencia]
+
+
+def _escrituras(sentencias):
+    return [sentencia for sentencia in sentencias if sentencia.lstrip().upper().startswith(('INSERT', 'UPDATE'))]
+
+
+def test_vista_de_solo_lectura_lee_de_la_replica(app, crear_usuario, crear_pedidos, cliente_http, replicar,
+                                                   vaciar_caches, contar_sentencias):
+    cliente = crear_usuario('cliente')
+    [replicado] = crear_pedidos(cliente, 1)
+    replicar()
+    # La réplica no recibe este pedido: queda atrasada
+    [atrasado] = crear_pedidos(cliente, 1)
+    vaciar_caches()
+
+    with contar_sentencias() as sentencias:
+        respuesta = cliente_http(cliente).get('/mis_pedidos')
+    assert respuesta.status_code == 200
+    assert _pedidos(sentencias['replica']) and not _pedidos(sentencias['primaria'])
+    assert f'#{replicado}</strong>' in respuesta.text
+    assert f'#{atrasado}</strong>' not in respuesta.text
+
+
+def test_tras_escribir_se_lee_de_la_primaria(app, crear_usuario, crear_pedidos, productos, cliente_http, replicar,
+                                              vaciar_caches, contar_sentencias):
+    cliente = crear_usuario('cliente')
+    crear_pedidos(cliente, 1)
+    replicar()
+    vaciar_caches()
+    http = cliente_http(cliente)
+
+    with contar_sentencias() as sentencias:
+        respuesta = http.post('/realizar_pedido', data={'productos': [str(productos[0])], 'cantidades': ['3']})
+    assert respuesta.status_code == 302
+    assert _escrituras(sentencias['primaria']) and not sentencias['replica']
+    nuevo = _ultimo_pedido(app, cliente)
+
+    # Dentro de la ventana de permanencia el mismo usuario lee de la primaria
+    with contar_sentencias() as sentencias:
+        respuesta = http.get('/mis_pedidos')
+    assert _pedidos(sentencias['primaria']) and not sentencias['replica']
+    assert f'#{nuevo}</strong>' in respuesta.text
+
+    # Vencida la ventana vuelve a la réplica, que todavía no tiene el pedido
+    with http.session_transaction() as sesion:
+        sesion[CLAVE_ESCRITURA] = time.time() - app.config['DB_REPLICA_STICKY_SECONDS'] - 1
+    vaciar_caches()
+    with contar_sentencias() as sentencias:
+        respuesta = http.get('/mis_pedidos')
+    assert _pedidos(sentencias['replica']) and not _pedidos(sentencias['primaria'])
+    assert f'#{nuevo}</strong>' not in respuesta.text
+
+
+def _app_con_escritura(binds):
+    """App mínima con una vista que escribe, con o sin réplica configurada"""
+    aplicacion = Flask(__name__)
+    aplicacion.config.update(SECRET_KEY='pruebas', SQLALCHEMY_BINDS=binds)
+    EnrutadorReplicas(aplicacion)
+
+    @aplicacion.post('/escribir')
+    def escribir():
+        g.hubo_escritura = True
+        return 'ok'
+    return aplicacion
+
+
+def test_sin_replica_las_escrituras_no_tocan_la_sesion():
+    respuesta = _app_con_escritura({}).test_client().post('/escribir')
+    assert 'Set-Cookie' not in respuesta.headers
+
+
+def test_con_replica_las_escrituras_anotan_la_hora():
+    respuesta = _app_con_escritura({'replica': 'sqlite://'}).test_client().post('/escribir')
+    assert 'Set-Cookie' in respuesta.headers
@@ -0,0 +1,36 @@
+"""Actualización incremental de las tablas de resumen (reportes.py)."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import reportes
+from models import db, Pedido, SeguimientoPedido, ResumenPedidosEstado
+
+
+def _estados_del_dia(dia):
+    return dict(db.session.execute(
+        select(ResumenPedidosEstado.estado, ResumenPedidosEstado.pedidos).where(ResumenPedidosEstado.dia == dia)
+    ).all())
+
+
+def test_pedido_antiguo_con_seguimiento_nuevo_se_recalcula(app, crear_usuario, crear_pedidos, cliente_http):
+    # El segundo pedido es de hoy: las marcas quedan en la fecha actual
+    id_pedido, _ = crear_pedidos(crear_usuario('cliente'), 2)
+    antes = datetime.utcnow() - timedelta(days=40)
+    with app.app_context():
+        db.session.execute(update(Pedido).where(Pedido.id_pedido == id_pedido).values(fecha=antes))
+        db.session.execute(update(SeguimientoPedido).where(SeguimientoPedido.id_pedido == id_pedido)
+                           .values(fecha=antes))
+        db.session.commit()
+        reportes.actualizar()
+        assert _estados_del_dia(antes.date()) == {'pendiente': 1}
+
+    respuesta = cliente_http(crear_usuario('empleado')).post(
+        f'/empleado/pedidos/{id_pedido}/actualizar', data={'estado': 'en_proceso', 'comentario': ''})
+    assert respuesta.status_code == 302
+
+    with app.app_context():
+        dias = reportes.actualizar()
+        assert _estados_del_dia(antes.date()) == {'en_proceso': 1}
+        # Solo el día del pedido cambiado, no todo el historial
+        assert dias['pedidos'] <= 2